@@ -0,0 +1,252 @@
+"""
+Anytime timetable generation.
+
+The first feasible solution is persisted as version 1 and returned to the
+caller right away; the same CP-SAT search keeps running in a background thread
+within a time budget, and a publisher thread writes the best solution so far
+(at most once per ANYTIME_PUBLISH_SECONDS) as the next version of that
+timetable. Each version
+swap is a single transaction, so readers always see one complete version.
+
+If the batch's timetables change underneath the run (an entry is moved, the
+batch is regenerated or the timetable deleted), the improvement stops rather
+than overwrite that change. So it does when other batches book teachers or
+rooms a new version would use: the model only knows the bookings made before
+it was built, so every version is re-checked against current occupancy first.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from backend.models.models import Timetable, OccupancyVersion
+from backend.feasibility import InfeasibleInputError
+from backend import occupancy
+
+ANYTIME_BUDGET_SECONDS = float(os.getenv("ANYTIME_BUDGET_SECONDS", "300"))
+ANYTIME_PUBLISH_SECONDS = float(os.getenv("ANYTIME_PUBLISH_SECONDS", "5"))
+
+# Runs still improving (or just finished), by timetable id
+_runs: Dict[int, "AnytimeRun"] = {}
+_lock = threading.Lock()
+
+
+class AnytimeRun:
+	"""One batch's background improvement; solver work happens on its own thread and session"""
+
+	def __init__(
+		self,
+		batch_id: int,
+		profile: Optional[str] = None,
+		time_limit: Optional[float] = None,
+		objective_mode: Optional[str] = None,
+	):
+		self.batch_id = batch_id
+		self.profile = profile
+		self.objective_mode = objective_mode
+		self.time_limit = time_limit or ANYTIME_BUDGET_SECONDS
+		self.status = "starting"  # improving, completed, superseded, stopped, failed, infeasible
+		self.timetable_id: Optional[int] = None
+		self.version = 0
+		self.objective: Optional[float] = None
+		self.best_bound: Optional[float] = None
+		self.elapsed = 0.0
+		self.error: Optional[Exception] = None
+		self.run = None
+		self.scheduler = None
+		self._first = threading.Event()
+		# Guards _pending and _done between the solver callback and the publisher thread
+		self._changed = threading.Condition()
+		self._pending: Optional[Dict[int, Dict]] = None
+		self._done = False
+		self._occupancy_version: Optional[int] = None
+		self._published_at = 0.0
+
+	def start(self) -> int:
+		"""Solve until the first solution is published; returns its timetable id.
+
+		Raises InfeasibleInputError or NoSolutionError like TimetableScheduler.generate().
+		"""
+		threading.Thread(target=self._solve, daemon=True).start()
+		self._first.wait()
+		if self.error is not None:
+			raise self.error
+		return self.timetable_id
+
+	def stop(self):
+		"""End the search; the best solution found so far is published as the last version"""
+		if self.scheduler is not None and self.status == "improving":
+			self.status = "stopped"
+			self.scheduler.stop()
+
+	def state(self) -> Dict[str, Any]:
+		return {
+			"timetable_id": self.timetable_id,
+			"batch_id": self.batch_id,
+			"status": self.status,
+			"version": self.version,
+			"objective": self.objective,
+			"best_bound": self.best_bound,
+			"elapsed": self.elapsed,
+			"time_limit": self.scheduler.solver_params["max_time_in_seconds"] if self.scheduler else self.time_limit,
+		}
+
+	def _solve(self):
+		from backend.database import SessionLocal
+		from backend.scheduler import TimetableScheduler, NoSolutionError
+
+		db = SessionLocal()
+		publisher = threading.Thread(target=self._publisher, daemon=True)
+		try:
+			self.scheduler = TimetableScheduler(
+				db,
+				self.batch_id,
+				use_cache=False,
+				progress_callback=self._on_solution,
+				stream_solutions=True,
+				profile=self.profile,
+				time_limit=self.time_limit,
+				objective_mode=self.objective_mode,
+			)
+			try:
+				self.scheduler.check_feasibility()
+			except InfeasibleInputError as e:
+				self.scheduler.record_run("infeasible")
+				self._fail("infeasible", e)
+				return
+			if not self.scheduler.offerings or not self.scheduler.teachers or not self.scheduler.rooms:
+				self._publish(db, {self.batch_id: {}})
+				self.status = "completed"
+				self.run = self.scheduler.record_run("generated", {self.batch_id: db.get(Timetable, self.timetable_id)})
+				return
+
+			self.status = "improving"
+			publisher.start()
+			solutions = self.scheduler.solve()
+			with self._changed:
+				self._done = True
+				self._changed.notify()
+			publisher.join()
+			if solutions is None and self.status == "superseded":
+				self.run = self.scheduler.record_run("failed")
+				return
+			if solutions is None:
+				self.run = self.scheduler.record_run("failed")
+				self._fail("failed", NoSolutionError([self.batch_id], self.run))
+				return
+			# The final extraction is authoritative; publish it unless it is already the current version
+			if self._pending is not None or self.timetable_id is None:
+				self._publish(db, solutions)
+			if self.timetable_id is None:
+				# Even the first solution clashed with bookings made meanwhile
+				self.run = self.scheduler.record_run("failed")
+				return
+			if self.status == "improving":
+				self.status = "completed"
+			self.run = self.scheduler.record_run("generated", {self.batch_id: db.get(Timetable, self.timetable_id)})
+		except Exception as e:
+			print(f"❌ Anytime generation for batch {self.batch_id} failed: {e}")
+			self._fail("failed", e)
+		finally:
+			with self._changed:
+				self._done = True
+				self._changed.notify()
+			db.close()
+			self._first.set()
+
+	def _fail(self, status: str, error: Exception):
+		self.status = status
+		if not self._first.is_set():
+			self.error = error
+			self._first.set()
+
+	def _on_solution(self, event: Dict[str, Any]):
+		"""Solution callback (solver thread): hand the solution to the publisher"""
+		with self._changed:
+			self.objective = event["objective"]
+			self.best_bound = event["best_bound"]
+			self.elapsed = event["elapsed"]
+			self._pending = event["solutions"]
+			self._changed.notify()
+
+	def _publisher(self):
+		"""Publish pending solutions, the first at once and then at most one per interval"""
+		from backend.database import SessionLocal
+
+		db = SessionLocal()
+		try:
+			while True:
+				with self._changed:
+					while not self._done and (self._pending is None or self._wait() > 0):
+						self._changed.wait(self._wait() if self._pending is not None else None)
+					if self._done:
+						return  # the solver thread publishes the final solution
+					solutions, self._pending = self._pending, None
+				self._publish(db, solutions)
+		except Exception as e:
+			print(f"❌ Publishing anytime solution for batch {self.batch_id} failed: {e}")
+			self._fail("failed", e)
+			self.scheduler.stop()
+		finally:
+			db.close()
+
+	def _wait(self) -> float:
+		"""Seconds until the next version may be published"""
+		if self.timetable_id is None:
+			return 0.0
+		return max(0.0, self._published_at + ANYTIME_PUBLISH_SECONDS - time.perf_counter())
+
+	def _publish(self, db, solutions: Dict[int, Dict]):
+		from backend.scheduler import persist_timetables, publish_version
+
+		self._pending = None
+		if self.status == "superseded":
+			return
+		db.commit()  # end the read transaction so bookings committed meanwhile are seen
+		clashes = occupancy.solution_clashes(db, solutions)
+		if clashes:
+			# Other batches booked teachers or rooms this version uses: stop instead of double-booking
+			self._fail("superseded", occupancy.OccupancyClashError([self.batch_id], clashes))
+			self.scheduler.stop()
+			return
+		if self.timetable_id is None:
+			timetable = persist_timetables(db, solutions)[self.batch_id]
+			self.timetable_id = timetable.timetable_id
+			self.version = timetable.version
+			with _lock:
+				# Only the newest run of a batch stays queryable once it has finished
+				for timetable_id, other in list(_runs.items()):
+					if other.batch_id == self.batch_id and other.status not in ("starting", "improving"):
+						del _runs[timetable_id]
+				_runs[self.timetable_id] = self
+			self._first.set()
+		else:
+			current = db.query(OccupancyVersion.version).filter(OccupancyVersion.batch_id == self.batch_id).scalar()
+			timetable = db.get(Timetable, self.timetable_id)
+			if timetable is None or current != self._occupancy_version:
+				# Someone else changed this batch's timetables: stop instead of overwriting
+				self.status = "superseded"
+				self.scheduler.stop()
+				return
+			self.version = publish_version(db, timetable, solutions[self.batch_id])
+			print(f"   ⏫ Published version {self.version} of timetable {self.timetable_id} (objective {self.objective})")
+		self._occupancy_version = db.query(OccupancyVersion.version).filter(OccupancyVersion.batch_id == self.batch_id).scalar()
+		self._published_at = time.perf_counter()
+
+
+def generate(
+	batch_id: int,
+	profile: Optional[str] = None,
+	time_limit: Optional[float] = None,
+	objective_mode: Optional[str] = None,
+) -> AnytimeRun:
+	"""Publish a first timetable for `batch_id` and keep improving it in the background"""
+	run = AnytimeRun(batch_id, profile, time_limit, objective_mode)
+	run.start()
+	return run
+
+
+def get(timetable_id: int) -> Optional[AnytimeRun]:
+	with _lock:
+		return _runs.get(timetable_id)
@@ -0,0 +1 @@
+"""Reproducible scheduler benchmarks on seeded synthetic institutions."""
@@ -0,0 +1,71 @@
+"""
+Benchmark the workload balancing formulations of TimetableScheduler.
+
+Builds a synthetic institution per teacher count and, for every balance mode,
+measures soft-constraint build time, model size and solve time.
+
+	python -m backend.benchmarks.balance_objective --teachers 30 90 150 300 --time-limit 10 --load-factor 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from typing import Dict, List
+
+from backend.benchmarks.synthetic import throwaway_session, build_institution
+from backend.scheduler import TimetableScheduler, BALANCE_MODES
+
+
+def run_case(teachers: int, mode: str, time_limit: float, seed: int, load_factor: float) -> Dict:
+	db, path = throwaway_session()
+	try:
+		batches = max(1, teachers // 3)
+		batch_ids = build_institution(
+			db, batches=batches, teachers=teachers, class_rooms=batches, lab_rooms=max(1, batches // 2),
+			load_factor=load_factor, seed=seed,
+		)
+		with contextlib.redirect_stdout(io.StringIO()):
+			scheduler = TimetableScheduler(db, batch_ids=batch_ids, balance_mode=mode, use_cache=False, time_limit=time_limit)
+			scheduler._create_variables()
+			scheduler._add_hard_constraints()
+			start = time.perf_counter()
+			scheduler._add_soft_constraints()
+			build_soft = time.perf_counter() - start
+			start = time.perf_counter()
+			solved = scheduler._solve()
+			solve = time.perf_counter() - start
+		proto = scheduler.model.Proto()
+		return {
+			"teachers": teachers,
+			"mode": mode,
+			"variables": len(proto.variables),
+			"constraints": len(proto.constraints),
+			"soft_build_s": round(build_soft, 4),
+			"solve_s": round(solve, 3),
+			"status": scheduler.solver.StatusName(),
+			"solved": solved,
+		}
+	finally:
+		db.close()
+		os.remove(path)
+
+
+def main(argv: List[str] = None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--teachers", type=int, nargs="+", default=[30, 90, 150, 300])
+	parser.add_argument("--modes", nargs="+", default=list(BALANCE_MODES), choices=BALANCE_MODES)
+	parser.add_argument("--time-limit", type=float, default=10.0)
+	parser.add_argument("--load-factor", type=float, default=0.3)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args(argv)
+
+	for teachers in args.teachers:
+		for mode in args.modes:
+			print(json.dumps(run_case(teachers, mode, args.time_limit, args.seed, args.load_factor)), flush=True)
+
+
+if __name__ == "__main__":
+	main()
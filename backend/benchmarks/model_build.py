@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of TimetableScheduler model construction (no solve).
+
+Times variable creation, hard constraints and soft constraints on a synthetic
+institution large enough to have several hundred offerings.
+
+	python -m backend.benchmarks.model_build --batches 100 --teachers 150 --repeat 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from typing import Dict, List
+
+from backend.benchmarks.synthetic import throwaway_session, build_institution
+from backend.scheduler import TimetableScheduler
+
+
+def time_build(db, batch_ids: List[int]) -> Dict:
+	with contextlib.redirect_stdout(io.StringIO()):
+		scheduler = TimetableScheduler(db, batch_ids=batch_ids, use_cache=False)
+		timings = {}
+		for phase in ("_create_variables", "_add_hard_constraints", "_add_soft_constraints"):
+			start = time.perf_counter()
+			getattr(scheduler, phase)()
+			timings[phase.lstrip("_")] = round(time.perf_counter() - start, 4)
+	timings["offerings"] = len(scheduler.offerings)
+	timings["variables"] = len(scheduler.model.Proto().variables)
+	timings["constraints"] = len(scheduler.model.Proto().constraints)
+	return timings
+
+
+def main(argv: List[str] = None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--batches", type=int, default=100)
+	parser.add_argument("--teachers", type=int, default=150)
+	parser.add_argument("--load-factor", type=float, default=0.5)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args(argv)
+
+	db, path = throwaway_session()
+	try:
+		batch_ids = build_institution(
+			db, batches=args.batches, teachers=args.teachers, class_rooms=args.batches,
+			lab_rooms=max(1, args.batches // 2), load_factor=args.load_factor, seed=args.seed,
+		)
+		for _ in range(args.repeat):
+			print(json.dumps(time_build(db, batch_ids)), flush=True)
+	finally:
+		db.close()
+		os.remove(path)
+
+
+if __name__ == "__main__":
+	main()
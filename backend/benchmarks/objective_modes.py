@@ -0,0 +1,62 @@
+"""
+Benchmark weighted against staged (lexicographic) objective handling.
+
+Builds one synthetic institution per batch count and solves it jointly in each
+objective mode under the same time budget, reporting the solver status, the
+value of every objective group and the time spent in each stage.
+
+	python -m backend.benchmarks.objective_modes --batches 10 20 40 --time-limit 60
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+from typing import Dict, List
+
+from backend.benchmarks.synthetic import throwaway_session, build_institution
+from backend.scheduler import TimetableScheduler, OBJECTIVE_MODES
+
+
+def run_case(batches: int, mode: str, time_limit: float, seed: int, load_factor: float) -> Dict:
+	db, path = throwaway_session()
+	try:
+		batch_ids = build_institution(
+			db, batches=batches, teachers=max(1, round(batches * 1.5)), class_rooms=batches,
+			lab_rooms=max(1, batches // 2), load_factor=load_factor, seed=seed,
+		)
+		with contextlib.redirect_stdout(io.StringIO()):
+			scheduler = TimetableScheduler(db, batch_ids=batch_ids, objective_mode=mode, use_cache=False, time_limit=time_limit)
+			scheduler.solve()
+		solver = scheduler.metrics()["solver"]
+		return {
+			"batches": batches,
+			"mode": mode,
+			"status": solver.get("solver_status"),
+			"solve_s": round(scheduler.timings.get("solve", 0.0), 3),
+			"objective": solver.get("objective_value"),
+			"objectives": solver.get("objectives"),
+			"stages": [(stage["stage"], stage["status"], stage["wall_time"]) for stage in solver.get("stages", [])],
+		}
+	finally:
+		db.close()
+		os.remove(path)
+
+
+def main(argv: List[str] = None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--batches", type=int, nargs="+", default=[10, 20, 40])
+	parser.add_argument("--modes", nargs="+", default=list(OBJECTIVE_MODES), choices=OBJECTIVE_MODES)
+	parser.add_argument("--time-limit", type=float, default=60.0)
+	parser.add_argument("--load-factor", type=float, default=0.3)
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args(argv)
+
+	for batches in args.batches:
+		for mode in args.modes:
+			print(json.dumps(run_case(batches, mode, args.time_limit, args.seed, args.load_factor)), flush=True)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,171 @@
+"""
+Scaling benchmark of timetable generation across institution sizes.
+
+Each case seeds a synthetic institution into its own throwaway SQLite database
+and generates it in a fresh process, so peak RSS is measured per case. The
+report is JSON: one record per case with build time, solve time, status,
+objective and peak RSS.
+
+	python -m backend.benchmarks.scaling --batches 5 10 20 40 --time-limit 30 --output report.json
+	python -m backend.benchmarks.scaling --batches 20 --mode joint --profile preview
+
+With --baseline, the run is compared with an earlier report and exits with
+status 1 when a case regresses beyond --tolerance (slower build or solve,
+higher peak RSS, or a worse solver status).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Solver statuses from best to worst; a case regresses if its status moves right
+STATUS_RANK = {"OPTIMAL": 0, "FEASIBLE": 1, "UNKNOWN": 2, "INFEASIBLE": 3, "MODEL_INVALID": 4}
+BUILD_PHASES = ("variables", "hard_constraints", "soft_constraints")
+
+
+def _peak_rss_mb() -> float:
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+	return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+	"""Seed and generate one institution; runs in its own process"""
+	from backend.benchmarks.synthetic import throwaway_session, build_institution
+	from backend.scheduler import TimetableScheduler, NoSolutionError
+	from backend.feasibility import InfeasibleInputError
+
+	db, path = throwaway_session()
+	try:
+		batch_ids = build_institution(
+			db,
+			batches=case["batches"],
+			teachers=case["teachers"],
+			class_rooms=case["class_rooms"],
+			lab_rooms=case["lab_rooms"],
+			labs_per_batch=case["labs_per_batch"],
+			load_factor=case["load_factor"],
+			seed=case["seed"],
+		)
+		runs: List[Dict[str, Any]] = []
+		start = time.perf_counter()
+		with contextlib.redirect_stdout(io.StringIO()):
+			# "batch" regenerates batch by batch like generate_timetable; "joint" solves all at once
+			groups = [[batch_id] for batch_id in batch_ids] if case["mode"] == "batch" else [batch_ids]
+			for group in groups:
+				scheduler = TimetableScheduler(db, batch_ids=group, use_cache=False, profile=case["profile"], time_limit=case["time_limit"])
+				try:
+					scheduler.generate_all()
+					runs.append(scheduler.metrics())
+				except NoSolutionError:
+					runs.append(scheduler.metrics())
+				except InfeasibleInputError as e:
+					runs.append({"timings": scheduler.timings, "solver": {"solver_status": "INFEASIBLE"}, "model": {}, "error": str(e)})
+		elapsed = time.perf_counter() - start
+
+		statuses = [run["solver"].get("solver_status") or "UNKNOWN" for run in runs]
+		objectives = [run["solver"].get("objective_value") for run in runs]
+		return {
+			**case,
+			"offerings": sum(run.get("num_offerings", 0) for run in runs),
+			"build_s": round(sum(run["timings"].get(phase, 0.0) for run in runs for phase in BUILD_PHASES), 4),
+			"solve_s": round(sum(run["timings"].get("solve", 0.0) for run in runs), 4),
+			"total_s": round(elapsed, 4),
+			"status": max(statuses, key=lambda status: STATUS_RANK.get(status, len(STATUS_RANK))),
+			"objective": sum(objectives) if objectives and None not in objectives else None,
+			"variables": sum(run["model"].get("num_variables", 0) for run in runs),
+			"constraints": sum(run["model"].get("num_constraints", 0) for run in runs),
+			"peak_rss_mb": _peak_rss_mb(),
+		}
+	finally:
+		db.close()
+		os.remove(path)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+	"""Regressions of `report` against `baseline`, matched by batch count"""
+	previous = {case["batches"]: case for case in baseline.get("cases", [])}
+	regressions = []
+	for case in report["cases"]:
+		old = previous.get(case["batches"])
+		if old is None:
+			continue
+		for key in ("build_s", "solve_s", "peak_rss_mb"):
+			# Ignore sub-10ms noise on tiny cases
+			if case[key] > old[key] * (1 + tolerance) and case[key] - old[key] > 0.01:
+				regressions.append(f"{case['batches']} batches: {key} {old[key]} -> {case[key]}")
+		if STATUS_RANK.get(case["status"], len(STATUS_RANK)) > STATUS_RANK.get(old["status"], len(STATUS_RANK)):
+			regressions.append(f"{case['batches']} batches: status {old['status']} -> {case['status']}")
+	return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--batches", type=int, nargs="+", default=[5, 10, 20, 40])
+	parser.add_argument("--teachers-per-batch", type=float, default=1.5)
+	parser.add_argument("--labs-per-batch", type=int, default=1)
+	parser.add_argument("--load-factor", type=float, default=0.3)
+	parser.add_argument("--mode", choices=("batch", "joint"), default="batch")
+	parser.add_argument("--profile", default="balanced", help="solver profile, see backend.scheduler.SOLVER_PROFILES")
+	parser.add_argument("--time-limit", type=float, help="override the profile's time limit (seconds)")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--output", help="write the JSON report to this file")
+	parser.add_argument("--baseline", help="earlier report to compare against")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing")
+	args = parser.parse_args(argv)
+
+	from ortools import __version__ as ortools_version
+
+	report: Dict[str, Any] = {
+		"environment": {
+			"python": platform.python_version(),
+			"ortools": ortools_version,
+			"platform": platform.platform(),
+			"cpu_count": os.cpu_count(),
+		},
+		"parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+		"cases": [],
+	}
+	# A fresh process per case keeps peak RSS and solver state independent
+	context = multiprocessing.get_context("spawn")
+	for batches in args.batches:
+		case = {
+			"batches": batches,
+			"teachers": max(1, round(batches * args.teachers_per_batch)),
+			"class_rooms": batches,
+			"lab_rooms": max(1, batches // 2),
+			"labs_per_batch": args.labs_per_batch,
+			"load_factor": args.load_factor,
+			"mode": args.mode,
+			"profile": args.profile,
+			"time_limit": args.time_limit,
+			"seed": args.seed,
+		}
+		with context.Pool(1) as pool:
+			result = pool.apply(run_case, (case,))
+		report["cases"].append(result)
+		print(json.dumps(result), flush=True)
+
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent=2)
+
+	if args.baseline:
+		with open(args.baseline) as f:
+			regressions = compare(report, json.load(f), args.tolerance)
+		for regression in regressions:
+			print(f"REGRESSION {regression}", file=sys.stderr)
+		if regressions:
+			sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
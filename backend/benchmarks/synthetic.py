@@ -0,0 +1,99 @@
+"""
+Seeded synthetic institutions for scheduler benchmarks.
+
+Everything is written to a throwaway SQLite database, so benchmarks never
+touch the development or production data.
+"""
+
+import os
+import random
+import tempfile
+from typing import List, Tuple
+
+from sqlalchemy import create_engine  # type: ignore[reportMissingImports]
+from sqlalchemy.orm import Session, sessionmaker  # type: ignore[reportMissingImports]
+
+from backend.database import Base
+from backend.models.models import Batch, Teacher, Subject, Room, SubjectOffering
+from backend.slot_grid import NUM_SLOTS
+
+SLOTS_PER_WEEK = NUM_SLOTS
+LAB_DURATION = 3
+
+
+def throwaway_session() -> Tuple[Session, str]:
+	"""Open a session on a fresh SQLite file; returns the session and the file path"""
+	fd, path = tempfile.mkstemp(prefix="scheduler_bench_", suffix=".db")
+	os.close(fd)
+	engine = create_engine(f"sqlite:///{path}", future=True)
+	Base.metadata.create_all(bind=engine)
+	return sessionmaker(bind=engine, autoflush=False, future=True)(), path
+
+
+def build_institution(
+	db: Session,
+	batches: int = 4,
+	teachers: int = 12,
+	class_rooms: int = 4,
+	lab_rooms: int = 2,
+	labs_per_batch: int = 1,
+	load_factor: float = 0.5,
+	seed: int = 0,
+) -> List[int]:
+	"""Populate `db` with a synthetic institution and return its batch ids.
+
+	`load_factor` is the share of each batch's weekly slots that its offerings
+	fill. Each lab is one weekly block of `LAB_DURATION` periods; theory
+	offerings take 2-5 sessions a week. Teachers are drawn at random, so the
+	same seed always produces the same institution.
+	"""
+	rng = random.Random(seed)
+
+	teacher_rows = [
+		Teacher(teacher_name=f"Teacher {i}", email=f"teacher{i}@bench.local", max_sessions_per_day=4, max_sessions_per_week=20)
+		for i in range(teachers)
+	]
+	room_rows = [Room(room_name=f"Room {i}", capacity=60, room_type="CLASSROOM") for i in range(class_rooms)]
+	room_rows += [Room(room_name=f"Lab {i}", capacity=30, room_type="LAB") for i in range(lab_rooms)]
+	batch_rows = [Batch(batch_name=f"Batch {i}", department=f"Dept {i % 4}") for i in range(batches)]
+	db.add_all(teacher_rows + room_rows + batch_rows)
+	db.flush()
+
+	weekly_load = {t.teacher_id: 0 for t in teacher_rows}
+	offerings: List[SubjectOffering] = []
+	for batch in batch_rows:
+		target = max(1, int(SLOTS_PER_WEEK * load_factor))
+		plan: List[Tuple[bool, int]] = [(True, 1)] * labs_per_batch
+		remaining = target - LAB_DURATION * labs_per_batch
+		while remaining > 0:
+			sessions = min(remaining, rng.randint(2, 5))
+			plan.append((False, sessions))
+			remaining -= sessions
+
+		for index, (is_lab, sessions) in enumerate(plan):
+			periods = sessions * LAB_DURATION if is_lab else sessions
+			# Prefer teachers with spare weekly capacity, fall back to any teacher
+			candidates = [t for t in teacher_rows if weekly_load[t.teacher_id] + periods <= t.max_sessions_per_week] or teacher_rows
+			teacher = rng.choice(candidates)
+			weekly_load[teacher.teacher_id] += periods
+			subject = Subject(
+				subject_name=f"{batch.batch_name} {'Lab' if is_lab else 'Subject'} {index}",
+				teacher_id=teacher.teacher_id,
+				sessions_per_week=sessions,
+				max_sessions_per_day=1 if is_lab else 2,
+				is_lab=is_lab,
+				lab_duration=LAB_DURATION if is_lab else None,
+			)
+			db.add(subject)
+			db.flush()
+			offerings.append(SubjectOffering(
+				subject_id=subject.subject_id,
+				teacher_id=teacher.teacher_id,
+				batch_id=batch.batch_id,
+				sessions_per_week=sessions,
+				max_sessions_per_day=1 if is_lab else 2,
+			))
+
+	db.add_all(offerings)
+	db.commit()
+	return [b.batch_id for b in batch_rows]
@@ -0,0 +1,150 @@
+"""
+Fast pre-solve feasibility checks for a TimetableScheduler.
+
+These are necessary conditions derived from the same inputs the CP-SAT model
+is built from (pruned slots, daily limits, lab blocks, shared teachers and
+rooms). When one fails the model is certainly infeasible, so the request is
+rejected in milliseconds instead of running the solver to its time limit.
+"""
+
+from typing import Any, Dict, List
+
+from backend.models.models import SubjectOffering
+from backend.slot_grid import DAYS, NUM_SLOTS, lab_block_starts
+
+
+class InfeasibleInputError(ValueError):
+	"""The scheduling inputs cannot be satisfied; `issues` lists why"""
+
+	def __init__(self, issues: List[Dict[str, Any]]):
+		self.issues = issues
+		summary = "; ".join(issue["message"] for issue in issues[:5])
+		if len(issues) > 5:
+			summary += f"; and {len(issues) - 5} more"
+		super().__init__(f"Infeasible scheduling input ({len(issues)} issue(s)): {summary}")
+
+	def __reduce__(self):
+		# Keep the issues when the error crosses a process boundary
+		return (InfeasibleInputError, (self.issues,))
+
+
+def _issue(check: str, message: str, offering_ids: List[int], required: int, available: int, **extra) -> Dict[str, Any]:
+	return {
+		"check": check,
+		"message": message,
+		"offering_ids": sorted(offering_ids),
+		"required": required,
+		"available": available,
+		**extra,
+	}
+
+
+def _max_disjoint_blocks(starts: List[int], duration: int) -> int:
+	"""Most non-overlapping blocks of `duration` periods among the given starts"""
+	count = 0
+	last_end = 0
+	for start in sorted(starts):
+		if start > last_end:
+			count += 1
+			last_end = start + duration - 1
+	return count
+
+
+def _required_periods(offering: SubjectOffering) -> int:
+	"""Periods an offering occupies per week; a lab session is a whole block"""
+	sessions = offering.sessions_per_week or 0
+	if offering.subject.is_lab:
+		return sessions * (offering.subject.lab_duration or 3)
+	return sessions
+
+
+def check(scheduler) -> List[Dict[str, Any]]:
+	"""Return every violated necessary condition of `scheduler`'s inputs.
+
+	An empty list does not prove the model feasible; a non-empty one proves it
+	infeasible.
+	"""
+	issues: List[Dict[str, Any]] = []
+	index = scheduler.index
+	week_slots = NUM_SLOTS
+
+	# Per offering: slots left after pruning, capped by the daily limits (C1, C4, C5)
+	for offering in scheduler.offerings:
+		sessions = offering.sessions_per_week or 0
+		if sessions <= 0:
+			continue
+		name = offering.subject.subject_name
+		daily_cap = offering.max_sessions_per_day or 2
+		teacher = index.teacher_by_id.get(offering.teacher_id)
+		if teacher:
+			daily_cap = min(daily_cap, teacher.max_sessions_per_day or 2)
+		if daily_cap * len(DAYS) < sessions:
+			issues.append(_issue(
+				"daily_limit",
+				f"{name} needs {sessions} sessions/week but its daily limit allows {daily_cap * len(DAYS)}",
+				[offering.offering_id], sessions, daily_cap * len(DAYS),
+			))
+			continue
+
+		allowed = scheduler._allowed_slots(offering).reshape(len(DAYS), -1)
+		if offering.subject.is_lab:
+			duration = offering.subject.lab_duration or 3
+			starts = lab_block_starts(duration)
+			per_day = [
+				_max_disjoint_blocks([s for s in starts if free[s - 1:s - 1 + duration].all()], duration)
+				for free in allowed
+			]
+			check_name, unit = "lab_blocks", f"lab blocks of {duration} periods"
+		else:
+			per_day = allowed.sum(axis=1).tolist()
+			check_name, unit = "slot_supply", "sessions"
+		supply = sum(min(count, daily_cap) for count in per_day)
+		if supply < sessions:
+			issues.append(_issue(
+				check_name,
+				f"{name} needs {sessions} {unit}/week but only {supply} fit in the free slots",
+				[offering.offering_id], sessions, supply,
+			))
+
+	# Per teacher: weekly periods against the slots not taken in other batches (C2, C8)
+	for teacher_id, offering_ids in index.teacher_offering_ids.items():
+		required = sum(_required_periods(index.offering_by_id[oid]) for oid in offering_ids)
+		available = week_slots - scheduler.teacher_occupancy.busy_count(teacher_id)
+		if required > available:
+			teacher = index.teacher_by_id.get(teacher_id)
+			name = teacher.teacher_name if teacher else f"Teacher {teacher_id}"
+			issues.append(_issue(
+				"teacher_capacity",
+				f"{name} must teach {required} periods/week but has {available} free slots",
+				offering_ids, required, available, teacher_id=teacher_id,
+			))
+
+	# Per room set: offerings whose candidate rooms all lie in a set must fit in
+	# that set's free slots (C3, C9). Checked for each offering's candidate set.
+	candidate_sets = {frozenset(rooms) for rooms in scheduler.room_candidates.values() if rooms}
+	for room_set in sorted(candidate_sets, key=sorted):
+		offering_ids = [oid for oid, rooms in scheduler.room_candidates.items() if rooms and room_set.issuperset(rooms)]
+		required = sum(_required_periods(index.offering_by_id[oid]) for oid in offering_ids)
+		available = sum(week_slots - scheduler.room_occupancy.busy_count(room_id) for room_id in room_set)
+		if required > available:
+			names = ", ".join(
+				index.room_by_id[room_id].room_name if room_id in index.room_by_id else f"Room {room_id}"
+				for room_id in sorted(room_set)
+			)
+			issues.append(_issue(
+				"room_capacity",
+				f"{names} are needed for {required} periods/week but have {available} free slots",
+				offering_ids, required, available, room_ids=sorted(room_set),
+			))
+
+	# Per batch: one class per slot (C10)
+	for batch_id, offering_ids in index.batch_offering_ids.items():
+		required = sum(_required_periods(index.offering_by_id[oid]) for oid in offering_ids)
+		if required > week_slots:
+			issues.append(_issue(
+				"batch_capacity",
+				f"Batch {batch_id} needs {required} periods/week but the week has {week_slots}",
+				offering_ids, required, week_slots, batch_id=batch_id,
+			))
+
+	return issues
@@ -0,0 +1,287 @@
+"""
+Asynchronous timetable generation jobs.
+
+Solves run on a bounded ProcessPoolExecutor whose workers import OR-Tools once
+at start-up, so the web tier only submits work and polls job state. Job state
+lives in the generation_jobs table; a worker notices a cancel request by
+polling its row and stops the CP-SAT search.
+
+Workers solve concurrently, each against the bookings of other batches as they
+were when its model was built. Persisting is serialized by a lock shared by the
+pool, under which the solution is re-checked against current bookings; a job
+whose teachers or rooms were booked meanwhile is solved again, the last time
+while holding that lock, so it cannot lose the race once more.
+
+Each active job records its owner, the host:pid of the server process whose
+pool queued it and then of the worker running it, and a running job's worker
+refreshes heartbeat_at. Several server processes can therefore share the
+table: at start-up a server only fails the jobs whose owner is gone.
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend.models.models import GenerationJob, Timetable, TimetableEntry
+from backend.feasibility import InfeasibleInputError
+from backend import occupancy, solution_cache
+from backend.occupancy import OccupancyClashError
+
+MAX_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+# Re-solves of a job whose teachers or rooms another job booked first
+CLASH_RETRIES = int(os.getenv("GENERATION_CLASH_RETRIES", "2"))
+CANCEL_POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 10.0
+# A running job whose heartbeat is older than this lost its worker
+STALE_SECONDS = float(os.getenv("GENERATION_STALE_SECONDS", "60"))
+
+ACTIVE_STATUSES = ("queued", "running", "cancelling")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_futures: Dict[int, Future] = {}
+_lock = threading.Lock()
+# Worker side: the pool's persist lock, see _init_worker
+_persist_lock = None
+
+
+def _init_worker(persist_lock):
+	"""Pre-warm a worker: own connection pool, OR-Tools and the scheduler imported"""
+	global _persist_lock
+	_persist_lock = persist_lock
+	from backend.database import engine
+	engine.dispose()
+	from ortools.sat.python import cp_model  # noqa: F401
+	import backend.scheduler  # noqa: F401
+
+
+def _warmup() -> int:
+	return os.getpid()
+
+
+def start_pool() -> ProcessPoolExecutor:
+	"""Create the worker pool and spawn every worker up front"""
+	global _executor
+	with _lock:
+		if _executor is None:
+			context = multiprocessing.get_context("spawn")
+			_executor = ProcessPoolExecutor(
+				max_workers=MAX_WORKERS,
+				mp_context=context,
+				initializer=_init_worker,
+				initargs=(context.RLock(),),
+			)
+			for _ in range(MAX_WORKERS):
+				_executor.submit(_warmup)
+		return _executor
+
+
+def shutdown_pool():
+	global _executor
+	with _lock:
+		if _executor is not None:
+			_executor.shutdown(wait=False, cancel_futures=True)
+			_executor = None
+			_futures.clear()
+
+
+def process_id() -> str:
+	"""host:pid naming this process as a job owner"""
+	return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _alive(pid: int) -> bool:
+	if pid == os.getpid():
+		return False  # this process just started, so an older job with its pid is not its own
+	if os.name == "nt":
+		return True  # os.kill(pid, 0) would terminate the process on Windows
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+	except PermissionError:
+		pass
+	return True
+
+
+def recover_jobs(db: Session) -> int:
+	"""Fail active jobs whose owning process is gone; nobody will ever finish them.
+
+	Owners on this host are checked by pid. Elsewhere only a running job's
+	heartbeat tells, so jobs of other hosts that no worker has claimed yet are
+	left alone.
+	"""
+	host = socket.gethostname()
+	stale_before = datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+	orphaned = []
+	for job in db.query(GenerationJob).filter(GenerationJob.status.in_(ACTIVE_STATUSES)):
+		owner_host, _, pid = (job.owner or "").rpartition(":")
+		stale = job.heartbeat_at is not None and job.heartbeat_at < stale_before
+		if not job.owner or stale or (owner_host == host and not _alive(int(pid))):
+			orphaned.append(job.job_id)
+	if orphaned:
+		db.query(GenerationJob).filter(
+			GenerationJob.job_id.in_(orphaned),
+			GenerationJob.status.in_(ACTIVE_STATUSES),
+		).update(
+			{"status": "failed", "error": "Interrupted: the server or worker running the job stopped", "finished_at": datetime.utcnow()},
+			synchronize_session=False,
+		)
+	db.commit()
+	return len(orphaned)
+
+
+def submit_job(db: Session, batch_id: int) -> GenerationJob:
+	"""Persist a queued job and hand it to the worker pool"""
+	job = GenerationJob(batch_id=batch_id, status="queued", created_at=datetime.utcnow(), owner=process_id())
+	db.add(job)
+	db.commit()
+	db.refresh(job)
+
+	future = start_pool().submit(_run_job, job.job_id, batch_id)
+	_futures[job.job_id] = future
+	future.add_done_callback(lambda f, job_id=job.job_id: _on_done(job_id, f))
+	return job
+
+
+def cancel_job(db: Session, job: GenerationJob) -> GenerationJob:
+	"""Cancel a queued job outright, or ask the worker of a running one to stop"""
+	future = _futures.get(job.job_id)
+	if job.status == "queued" and future is not None and future.cancel():
+		job.status = "cancelled"
+		job.finished_at = datetime.utcnow()
+		db.commit()
+	elif job.status in ("queued", "running"):
+		db.query(GenerationJob).filter(
+			GenerationJob.job_id == job.job_id,
+			GenerationJob.status.in_(("queued", "running")),
+		).update({"status": "cancelling"}, synchronize_session=False)
+		db.commit()
+	db.refresh(job)
+	return job
+
+
+def _on_done(job_id: int, future: Future):
+	"""Runs in the web process: record crashes the worker could not report itself"""
+	_futures.pop(job_id, None)
+	if future.cancelled() or future.exception() is None:
+		return
+	from backend.database import SessionLocal
+	db = SessionLocal()
+	try:
+		_finish(db, job_id, "failed", error=repr(future.exception()))
+	finally:
+		db.close()
+
+
+def _finish(db: Session, job_id: int, status: str, timetable_id: Optional[int] = None, error: Optional[str] = None):
+	job = db.get(GenerationJob, job_id)
+	if job is None:
+		return
+	job.status = status
+	job.timetable_id = timetable_id
+	job.error = error
+	job.finished_at = datetime.utcnow()
+	db.commit()
+
+
+def _watch_cancel(job_id: int, scheduler, done: threading.Event):
+	"""Worker-side thread: stop the solver once the job is marked cancelling, and keep its heartbeat"""
+	from backend.database import SessionLocal
+	db = SessionLocal()
+	beat = time.monotonic()
+	try:
+		while not done.wait(CANCEL_POLL_SECONDS):
+			if time.monotonic() - beat >= HEARTBEAT_SECONDS:
+				db.query(GenerationJob).filter(GenerationJob.job_id == job_id).update(
+					{"heartbeat_at": datetime.utcnow()}, synchronize_session=False,
+				)
+				db.commit()
+				beat = time.monotonic()
+			status = db.query(GenerationJob.status).filter(GenerationJob.job_id == job_id).scalar()
+			db.rollback()  # end the read transaction so the next poll sees fresh state
+			if status == "cancelling":
+				scheduler.stop()
+	finally:
+		db.close()
+
+
+def _run_job(job_id: int, batch_id: int):
+	"""Worker-side entry point: generate and persist the timetable of one job"""
+	from backend.database import SessionLocal
+	from backend.scheduler import TimetableScheduler, NoSolutionError
+
+	db = SessionLocal()
+	try:
+		claimed = db.query(GenerationJob).filter(
+			GenerationJob.job_id == job_id,
+			GenerationJob.status == "queued",
+		).update(
+			{"status": "running", "started_at": datetime.utcnow(), "owner": process_id(), "heartbeat_at": datetime.utcnow()},
+			synchronize_session=False,
+		)
+		db.commit()
+		if not claimed:
+			_finish(db, job_id, "cancelled")
+			return
+
+		for attempt in range(CLASH_RETRIES + 1):
+			# Another job may book some of these teachers or rooms first; solve again around
+			# them, and on the last attempt hold the persist lock so none can be booked meanwhile
+			last = attempt == CLASH_RETRIES and _persist_lock is not None
+			with _persist_lock if last else contextlib.nullcontext():
+				scheduler = TimetableScheduler(db, batch_id, persist_lock=_persist_lock)
+				done = threading.Event()
+				watcher = threading.Thread(target=_watch_cancel, args=(job_id, scheduler, done), daemon=True)
+				watcher.start()
+				infeasible: Optional[InfeasibleInputError] = None
+				clash: Optional[OccupancyClashError] = None
+				try:
+					tt = scheduler.generate()
+				except NoSolutionError:
+					tt = None
+				except InfeasibleInputError as e:
+					tt, infeasible = None, e
+				except OccupancyClashError as e:
+					tt, clash = None, e
+				finally:
+					done.set()
+
+			status = db.query(GenerationJob.status).filter(GenerationJob.job_id == job_id).scalar()
+			if clash is None or status == "cancelling":
+				break
+
+		if status == "cancelling":
+			if tt is not None:
+				# Discard whatever the interrupted search produced
+				db.query(TimetableEntry).filter(TimetableEntry.timetable_id == tt.timetable_id).delete(synchronize_session=False)
+				db.query(Timetable).filter(Timetable.timetable_id == tt.timetable_id).delete(synchronize_session=False)
+				occupancy.touch(db, [batch_id])
+				db.commit()
+				occupancy.forget([batch_id])
+			if scheduler.stored_cache_key:
+				solution_cache.discard(db, scheduler.stored_cache_key)
+			_finish(db, job_id, "cancelled")
+		elif tt is not None:
+			_finish(db, job_id, "completed", timetable_id=tt.timetable_id)
+		elif clash is not None:
+			_finish(db, job_id, "failed", error=json.dumps({"message": str(clash), "clashes": clash.detail()}))
+		elif infeasible is not None:
+			# Same detail as the 422 of a synchronous generate
+			_finish(db, job_id, "infeasible", error=json.dumps({"message": str(infeasible), "issues": infeasible.issues}, default=str))
+		else:
+			_finish(db, job_id, "failed", error="No solution found")
+	except Exception:
+		db.rollback()
+		_finish(db, job_id, "failed", error=traceback.format_exc())
+	finally:
+		db.close()
@@ -9,11 +9,12 @@ except Exception:
 	# Proceed without .env if python-dotenv is not installed
 	pass
 
-from backend.database import Base, engine
+from backend.database import Base, engine, SessionLocal
 from backend.models import *  # noqa: F401,F403 to register models
 from backend.routers.data import router as data_router
 from backend.routers.timetables import router as timetables_router
 from backend.routers.auth import router as auth_router
+from backend import jobs
 
 app = FastAPI()
 
@@ -30,6 +31,21 @@ app.add_middleware(
 Base.metadata.create_all(bind=engine)
 
 
+@app.on_event("startup")
+def start_generation_workers():
+	db = SessionLocal()
+	try:
+		jobs.recover_jobs(db)
+	finally:
+		db.close()
+	jobs.start_pool()
+
+
+@app.on_event("shutdown")
+def stop_generation_workers():
+	jobs.shutdown_pool()
+
+
 @app.get("/")
 def read_root():
 	return {"message": "Hello from FastAPI 🎉"}
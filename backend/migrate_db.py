@@ -27,6 +27,10 @@ def migrate_database():
         ("subject_offerings", "priority", "INTEGER DEFAULT 1"),
         ("timetable_entries", "is_lab_session", "BOOLEAN DEFAULT 0"),
         ("timetable_entries", "lab_session_part", "INTEGER"),
+        ("scheduler_runs", "profile", "VARCHAR(20)"),
+        ("timetables", "version", "INTEGER DEFAULT 1"),
+        ("generation_jobs", "owner", "VARCHAR(128)"),
+        ("generation_jobs", "heartbeat_at", "DATETIME"),
     ]
     
     # Create admin table if it doesn't exist
@@ -7,6 +7,10 @@ from .models import (
 	Timetable,
 	TimetableEntry,
 	DayOfWeek,
+	SolutionCacheEntry,
+	GenerationJob,
+	SchedulerRun,
+	OccupancyVersion,
 	Admin,
 )
 
@@ -19,5 +23,9 @@ __all__ = [
 	"Timetable",
 	"TimetableEntry",
 	"DayOfWeek",
+	"SolutionCacheEntry",
+	"GenerationJob",
+	"SchedulerRun",
+	"OccupancyVersion",
 	"Admin",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Boolean, UniqueConstraint, Text, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -83,6 +83,7 @@ class Timetable(Base):
 	batch_id = Column(Integer, ForeignKey("batches.batch_id"), nullable=False)
 	generation_date = Column(DateTime, default=datetime.utcnow, nullable=False)
 	status = Column(String(30), default="generated", nullable=False)
+	version = Column(Integer, default=1, nullable=False)  # bumped each time anytime generation publishes a better solution
 
 	batch = relationship("Batch", back_populates="timetables")
 	entries = relationship("TimetableEntry", back_populates="timetable", cascade="all, delete-orphan")
@@ -103,6 +104,72 @@ class TimetableEntry(Base):
 	timetable = relationship("Timetable", back_populates="entries")
 
 
+class SolutionCacheEntry(Base):
+	__tablename__ = "solution_cache"
+	fingerprint = Column(String(64), primary_key=True)  # SHA-256 of the normalized solver inputs
+	batch_ids = Column(String(255), nullable=False)
+	payload = Column(Text, nullable=False)  # JSON entries per batch
+	size_bytes = Column(Integer, nullable=False)
+	hit_count = Column(Integer, default=0, nullable=False)
+	created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+	last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GenerationJob(Base):
+	__tablename__ = "generation_jobs"
+	job_id = Column(Integer, primary_key=True, index=True)
+	batch_id = Column(Integer, ForeignKey("batches.batch_id"), nullable=False)
+	status = Column(String(20), default="queued", nullable=False)  # queued, running, cancelling, cancelled, completed, failed, infeasible
+	timetable_id = Column(Integer, ForeignKey("timetables.timetable_id", ondelete="SET NULL"), nullable=True)
+	error = Column(Text, nullable=True)
+	created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+	started_at = Column(DateTime, nullable=True)
+	finished_at = Column(DateTime, nullable=True)
+	owner = Column(String(128), nullable=True)  # host:pid of the submitting server while queued, of the worker once running
+	heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the worker while running
+
+
+class SchedulerRun(Base):
+	__tablename__ = "scheduler_runs"
+	run_id = Column(Integer, primary_key=True, index=True)
+	batch_ids = Column(String(255), nullable=False)
+	timetable_ids = Column(String(255), nullable=True)
+	status = Column(String(20), nullable=False)  # generated, failed, infeasible
+	cache_hit = Column(Boolean, default=False, nullable=False)
+	num_offerings = Column(Integer, nullable=False)
+	profile = Column(String(20), nullable=True)  # solver profile, see backend.scheduler.SOLVER_PROFILES
+	# Phase durations in seconds
+	load_seconds = Column(Float, nullable=True)
+	rooms_seconds = Column(Float, nullable=True)
+	precheck_seconds = Column(Float, nullable=True)
+	variables_seconds = Column(Float, nullable=True)
+	hard_constraints_seconds = Column(Float, nullable=True)
+	soft_constraints_seconds = Column(Float, nullable=True)
+	solve_seconds = Column(Float, nullable=True)
+	extract_seconds = Column(Float, nullable=True)
+	persist_seconds = Column(Float, nullable=True)
+	total_seconds = Column(Float, nullable=True)
+	# Model size
+	num_variables = Column(Integer, nullable=True)
+	num_constraints = Column(Integer, nullable=True)
+	num_objective_terms = Column(Integer, nullable=True)
+	# CP-SAT statistics
+	solver_status = Column(String(20), nullable=True)
+	solver_wall_time = Column(Float, nullable=True)
+	num_conflicts = Column(Integer, nullable=True)
+	num_branches = Column(Integer, nullable=True)
+	objective_value = Column(Float, nullable=True)
+	best_bound = Column(Float, nullable=True)
+	created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class OccupancyVersion(Base):
+	__tablename__ = "occupancy_versions"
+	batch_id = Column(Integer, ForeignKey("batches.batch_id"), primary_key=True)
+	version = Column(Integer, default=0, nullable=False)  # Bumped whenever the batch's entries change
+	updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
 class Admin(Base):
 	__tablename__ = "admins"
 	admin_id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,66 @@
+"""
+Validation of manual timetable entry moves.
+
+A move is checked against one projected read of the entry's own timetable and
+the cached cross-batch occupancy (see backend.occupancy), so its cost does not
+grow with the number of conflicting entries. Every violated rule is reported,
+not just the first.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend import occupancy
+from backend.models.models import TimetableEntry, DayOfWeek
+from backend.occupancy import OccupancyGrid
+from backend.slot_grid import GRID, DAY_INDEX
+
+
+def _violation(rule: str, message: str) -> Dict[str, Any]:
+	return {"rule": rule, "message": message}
+
+
+def check(db: Session, entry: TimetableEntry, day: DayOfWeek, period: int) -> List[Dict[str, Any]]:
+	"""Return every rule broken by moving `entry` to (`day`, `period`)"""
+	violations: List[Dict[str, Any]] = []
+	batch_id = entry.timetable.batch_id
+	own = db.query(
+		TimetableEntry.entry_id,
+		TimetableEntry.subject_id,
+		TimetableEntry.teacher_id,
+		TimetableEntry.day_of_week,
+		TimetableEntry.period_number,
+	).filter(TimetableEntry.timetable_id == entry.timetable_id, TimetableEntry.entry_id != entry.entry_id).all()
+
+	# Half-day separation for the same subject within a day
+	session = GRID.session_of(period)
+	if entry.subject_id is not None and any(
+		subject_id == entry.subject_id and other_day == day and GRID.contains(other_day, other_period) and GRID.session_of(other_period) == session
+		for _, subject_id, _, other_day, other_period in own
+	):
+		violations.append(_violation("half_day", "Subject already scheduled in this half-day. Pick the other half."))
+
+	if entry.teacher_id is None:
+		return violations
+
+	teacher_slots, _, lab_slots = occupancy.batch_slots(db, [batch_id])
+	teacher_slots = teacher_slots[teacher_slots[:, 0] == entry.teacher_id]
+
+	# Lab half-day conflict for the same teacher in another batch
+	if entry.is_lab_session:
+		labs = OccupancyGrid.from_slots(lab_slots[lab_slots[:, 0] == entry.teacher_id])
+		if labs.busy(entry.teacher_id)[DAY_INDEX[day], GRID.session_columns(period)].any():
+			violations.append(_violation("lab_half_day", "This teacher has a lab in the same half-day for another class."))
+
+	# Teacher availability in other batches and in this timetable
+	own_slots = np.array(
+		[(entry.teacher_id, DAY_INDEX[d], p - 1) for _, _, teacher_id, d, p in own if teacher_id == entry.teacher_id and GRID.contains(d, p)],
+		dtype=np.int32,
+	).reshape(-1, 3)
+	teacher = OccupancyGrid.from_slots(np.concatenate([teacher_slots, own_slots]))
+	if teacher.is_busy(entry.teacher_id, day, period):
+		violations.append(_violation("teacher_busy", "Teacher is busy this period."))
+
+	return violations
@@ -0,0 +1,318 @@
+"""
+Teacher and room occupancy as NumPy tensors.
+
+OccupancyGrid counts booked sessions per entity x day x period in a uint8
+array, with rows indexed by entity id, so point lookups are one array index and
+institution-wide questions (free slots, conflicts, load per day, utilization)
+are vectorized.
+
+Cross-batch occupancy: only the latest generated timetable of each batch
+occupies its teachers and rooms (and, for lab sessions, lab teachers). Its busy slots are read with a
+column-projected query and cached per batch in this process as index arrays.
+Every write path bumps the batch's row in occupancy_versions, so a cached batch
+is reloaded only after it changed, here or in another process. Writes made in
+this process update the cache in place.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func  # type: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend.models.models import Timetable, TimetableEntry, OccupancyVersion, DayOfWeek
+from backend.slot_grid import GRID, DAYS, DAY_INDEX, NUM_PERIODS
+
+# (teacher_id or room_id, day, period)
+Slot = Tuple[int, DayOfWeek, int]
+
+
+class OccupancyGrid:
+	"""Sessions booked per entity x day x period"""
+
+	def __init__(self, size: int = 0):
+		self.counts = np.zeros((size, len(DAYS), NUM_PERIODS), dtype=np.uint8)
+
+	@classmethod
+	def from_slots(cls, slots: np.ndarray) -> "OccupancyGrid":
+		"""Build from an (n, 3) array of (entity_id, day_index, period_index) rows"""
+		grid = cls(int(slots[:, 0].max()) + 1 if len(slots) else 0)
+		np.add.at(grid.counts, (slots[:, 0], slots[:, 1], slots[:, 2]), 1)
+		return grid
+
+	@classmethod
+	def from_entries(cls, entries: Iterable[Slot]) -> "OccupancyGrid":
+		return cls.from_slots(slot_array(entries))
+
+	def _grow(self, size: int):
+		if size > len(self.counts):
+			grown = np.zeros((size, len(DAYS), NUM_PERIODS), dtype=np.uint8)
+			grown[:len(self.counts)] = self.counts
+			self.counts = grown
+
+	def add(self, entity_id: int, day: DayOfWeek, period: int, count: int = 1):
+		self._grow(entity_id + 1)
+		self.counts[entity_id, DAY_INDEX[day], period - 1] += count
+
+	def remove(self, entity_id: int, day: DayOfWeek, period: int, count: int = 1):
+		if self.is_busy(entity_id, day, period):
+			self.counts[entity_id, DAY_INDEX[day], period - 1] -= count
+
+	def count(self, entity_id: int, day: DayOfWeek, period: int) -> int:
+		if entity_id >= len(self.counts) or not GRID.contains(day, period):
+			return 0
+		return int(self.counts[entity_id, DAY_INDEX[day], period - 1])
+
+	def is_busy(self, entity_id: int, day: DayOfWeek, period: int) -> bool:
+		return self.count(entity_id, day, period) > 0
+
+	def busy(self, entity_id: int) -> np.ndarray:
+		"""Boolean day x period mask of the entity's booked slots"""
+		if entity_id >= len(self.counts):
+			return np.zeros((len(DAYS), NUM_PERIODS), dtype=bool)
+		return self.counts[entity_id] > 0
+
+	def free_slots(self, entity_id: int) -> List[Tuple[DayOfWeek, int]]:
+		return [(DAYS[d], p + 1) for d, p in np.argwhere(~self.busy(entity_id))]
+
+	def busy_count(self, entity_id: int) -> int:
+		"""Number of distinct booked slots of the entity"""
+		return int(self.busy(entity_id).sum())
+
+	def conflicts(self) -> List[Tuple[int, DayOfWeek, int, int]]:
+		"""(entity_id, day, period, sessions) of every slot booked more than once"""
+		return [
+			(int(e), DAYS[d], int(p) + 1, int(self.counts[e, d, p]))
+			for e, d, p in np.argwhere(self.counts > 1)
+		]
+
+	def load_per_day(self) -> np.ndarray:
+		"""Sessions per entity x day"""
+		return self.counts.sum(axis=2, dtype=np.int32)
+
+	def load(self) -> np.ndarray:
+		"""Sessions per entity over the week"""
+		return self.counts.sum(axis=(1, 2), dtype=np.int32)
+
+	def utilization(self) -> np.ndarray:
+		"""Share of each entity's weekly slots that are booked"""
+		return (self.counts > 0).sum(axis=(1, 2)) / GRID.num_slots
+
+	def slots(self) -> List[Slot]:
+		"""Every booked (entity_id, day, period), ordered"""
+		return [(int(e), DAYS[d], int(p) + 1) for e, d, p in np.argwhere(self.counts > 0)]
+
+
+def slot_array(entries: Iterable[Slot]) -> np.ndarray:
+	"""(entity_id, day, period) tuples as an (n, 3) int32 index array.
+
+	Slots outside the configured week (e.g. written before the grid was
+	shrunk) can never be scheduled again and are left out.
+	"""
+	rows = [(entity_id, DAY_INDEX[day], period - 1) for entity_id, day, period in entries if GRID.contains(day, period)]
+	return np.array(rows, dtype=np.int32).reshape(-1, 3)
+
+
+class BatchOccupancy:
+	"""Busy teacher, room and lab-teacher slots of one batch's latest timetable, as index arrays"""
+
+	__slots__ = ("timetable_id", "version", "teacher_slots", "room_slots", "lab_slots")
+
+	def __init__(self, timetable_id: int, version: int, teacher_slots: np.ndarray, room_slots: np.ndarray, lab_slots: np.ndarray):
+		self.timetable_id = timetable_id
+		self.version = version
+		self.teacher_slots = teacher_slots
+		self.room_slots = room_slots
+		self.lab_slots = lab_slots
+
+
+_cache: Dict[int, BatchOccupancy] = {}
+_lock = threading.Lock()
+
+OCCUPANCY_STATS: Dict[str, int] = {"hits": 0, "loads": 0}
+
+
+def touch(db: Session, batch_ids: Iterable[int]) -> Dict[int, int]:
+	"""Bump the occupancy version of batches whose entries are being changed.
+
+	Call inside the writing transaction, before its commit. Returns the new
+	version of each batch.
+	"""
+	batch_ids = sorted(set(batch_ids))
+	if not batch_ids:
+		return {}
+	db.query(OccupancyVersion).filter(OccupancyVersion.batch_id.in_(batch_ids)).update(
+		{OccupancyVersion.version: OccupancyVersion.version + 1},
+		synchronize_session=False,
+	)
+	versions = dict(db.query(OccupancyVersion.batch_id, OccupancyVersion.version).filter(OccupancyVersion.batch_id.in_(batch_ids)))
+	for batch_id in batch_ids:
+		if batch_id not in versions:
+			db.add(OccupancyVersion(batch_id=batch_id, version=1))
+			versions[batch_id] = 1
+	db.flush()
+	return versions
+
+
+def remember(
+	batch_id: int,
+	timetable_id: int,
+	version: int,
+	teacher_slots: Iterable[Slot],
+	room_slots: Iterable[Slot],
+	lab_slots: Iterable[Slot] = (),
+):
+	"""Cache the slots of a timetable that was just written, saving a reload"""
+	with _lock:
+		_cache[batch_id] = BatchOccupancy(timetable_id, version, slot_array(teacher_slots), slot_array(room_slots), slot_array(lab_slots))
+
+
+def move(
+	batch_id: int,
+	timetable_id: int,
+	version: int,
+	teacher_id: Optional[int],
+	room_id: Optional[int],
+	old: Tuple[DayOfWeek, int],
+	new: Tuple[DayOfWeek, int],
+	is_lab: bool = False,
+):
+	"""Apply a committed entry move to the cached slots of its batch"""
+	if not GRID.contains(*old) or not GRID.contains(*new):
+		forget([batch_id])
+		return
+	old_row = (DAY_INDEX[old[0]], old[1] - 1)
+	new_row = (DAY_INDEX[new[0]], new[1] - 1)
+	with _lock:
+		cached = _cache.get(batch_id)
+		if cached is None or cached.timetable_id != timetable_id:
+			return  # not cached, or a historical timetable that occupies nothing
+		if cached.version != version - 1:
+			# Someone else changed the batch since it was cached: reload it instead
+			del _cache[batch_id]
+			return
+		moved = [(cached.teacher_slots, teacher_id), (cached.room_slots, room_id)]
+		if is_lab:
+			moved.append((cached.lab_slots, teacher_id))
+		rows = []
+		for slots, entity_id in moved:
+			if not entity_id:
+				continue
+			matches = np.flatnonzero((slots == (entity_id, *old_row)).all(axis=1))
+			if not len(matches):
+				del _cache[batch_id]  # the cache does not match the database
+				return
+			rows.append((slots, matches[0]))
+		for slots, row in rows:
+			slots[row, 1:] = new_row
+		cached.version = version
+
+
+def forget(batch_ids: Iterable[int]):
+	"""Drop cached batches, e.g. after their timetables were deleted"""
+	with _lock:
+		for batch_id in batch_ids:
+			_cache.pop(batch_id, None)
+
+
+def latest_timetables(db: Session) -> Dict[int, int]:
+	"""Latest generated timetable id of every batch"""
+	return dict(
+		db.query(Timetable.batch_id, func.max(Timetable.timetable_id))
+		.filter(Timetable.status == "generated")
+		.group_by(Timetable.batch_id)
+	)
+
+
+def timetable_slots(db: Session, timetable_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""Projected read of one timetable's busy teacher, room and lab-teacher slots, as index arrays"""
+	rows = db.query(
+		TimetableEntry.teacher_id,
+		TimetableEntry.room_id,
+		TimetableEntry.day_of_week,
+		TimetableEntry.period_number,
+		TimetableEntry.is_lab_session,
+	).filter(TimetableEntry.timetable_id == timetable_id).all()
+	teacher_slots = slot_array((teacher_id, day, period) for teacher_id, _, day, period, _ in rows if teacher_id)
+	room_slots = slot_array((room_id, day, period) for _, room_id, day, period, _ in rows if room_id)
+	lab_slots = slot_array((teacher_id, day, period) for teacher_id, _, day, period, is_lab in rows if teacher_id and is_lab)
+	return teacher_slots, room_slots, lab_slots
+
+
+def batch_slots(db: Session, exclude_batch_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""Busy teacher, room and lab-teacher slots of every batch except `exclude_batch_ids`.
+
+	Costs two small queries plus a projected load of each batch that changed
+	since it was cached. Returns (n, 3) index arrays owned by the caller.
+	"""
+	latest = latest_timetables(db)
+	versions = dict(db.query(OccupancyVersion.batch_id, OccupancyVersion.version))
+	excluded = set(exclude_batch_ids)
+
+	parts: List[BatchOccupancy] = []
+	with _lock:
+		for batch_id in set(_cache) - set(latest):
+			del _cache[batch_id]
+		for batch_id, timetable_id in latest.items():
+			if batch_id in excluded:
+				continue
+			version = versions.get(batch_id, 0)
+			cached = _cache.get(batch_id)
+			if cached is None or cached.timetable_id != timetable_id or cached.version != version:
+				cached = BatchOccupancy(timetable_id, version, *timetable_slots(db, timetable_id))
+				_cache[batch_id] = cached
+				OCCUPANCY_STATS["loads"] += 1
+			else:
+				OCCUPANCY_STATS["hits"] += 1
+			parts.append(cached)
+		# Concatenate under the lock: move() edits cached arrays in place
+		return tuple(
+			np.concatenate([getattr(part, field) for part in parts]) if parts else np.zeros((0, 3), dtype=np.int32)
+			for field in ("teacher_slots", "room_slots", "lab_slots")
+		)
+
+
+def busy_grids(db: Session, exclude_batch_ids: Iterable[int]) -> Tuple[OccupancyGrid, OccupancyGrid]:
+	"""Teacher and room occupancy of every batch except `exclude_batch_ids`"""
+	teacher_slots, room_slots, _ = batch_slots(db, exclude_batch_ids)
+	return OccupancyGrid.from_slots(teacher_slots), OccupancyGrid.from_slots(room_slots)
+
+
+def clashes(db: Session, batch_id: int, timetable_id: int) -> List[Tuple[str, int, DayOfWeek, int]]:
+	"""("teacher" or "room", id, day, period) of every slot of `timetable_id` booked by another batch"""
+	own_teachers, own_rooms, _ = timetable_slots(db, timetable_id)
+	return _clashes(db, [batch_id], own_teachers, own_rooms)
+
+
+def solution_clashes(db: Session, solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]) -> List[Tuple[str, int, DayOfWeek, int]]:
+	"""Like clashes(), for unsaved solutions keyed by batch and (day, period)"""
+	placed = [(day, period, data) for solution in solutions.values() for (day, period), data in solution.items()]
+	own_teachers = slot_array((data["teacher_id"], day, period) for day, period, data in placed if data.get("teacher_id"))
+	own_rooms = slot_array((data["room_id"], day, period) for day, period, data in placed if data.get("room_id"))
+	return _clashes(db, solutions.keys(), own_teachers, own_rooms)
+
+
+def _clashes(db: Session, batch_ids: Iterable[int], own_teachers: np.ndarray, own_rooms: np.ndarray) -> List[Tuple[str, int, DayOfWeek, int]]:
+	teacher_slots, room_slots, _ = batch_slots(db, batch_ids)
+	found = []
+	for kind, others, own in (("teacher", teacher_slots, own_teachers), ("room", room_slots, own_rooms)):
+		booked = OccupancyGrid.from_slots(others)
+		found.extend((kind, *slot) for slot in OccupancyGrid.from_slots(own).slots() if booked.is_busy(*slot))
+	return found
+
+
+class OccupancyClashError(RuntimeError):
+	"""Other batches booked teachers or rooms of a solution after it was modelled"""
+
+	def __init__(self, batch_ids: List[int], clashes: List[Tuple[str, int, DayOfWeek, int]], run=None):
+		self.batch_ids = batch_ids
+		self.clashes = clashes
+		self.run = run
+		super().__init__(f"Teachers or rooms of batch(es) {batch_ids} were booked by other batches during the solve")
+
+	def __reduce__(self):
+		return (OccupancyClashError, (self.batch_ids, self.clashes, self.run))
+
+	def detail(self) -> List[Dict]:
+		return [{"kind": kind, "id": entity_id, "day": day.value, "period": period} for kind, entity_id, day, period in self.clashes]
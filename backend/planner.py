@@ -0,0 +1,160 @@
+"""
+Decompose an institution-wide regenerate into independent sub-problems.
+
+Batches that share no teacher and no room cannot conflict, so each connected
+component of the batch-teacher-room sharing graph is solved as its own joint
+CP-SAT model in a separate process. The solved entries are merged back into
+the usual Timetable / TimetableEntry rows by the parent process.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend.models.models import Timetable, Room, SubjectOffering, Subject, DayOfWeek, SchedulerRun
+from backend.scheduler import TimetableScheduler, eligible_rooms, persist_timetables
+from backend import feasibility, run_log
+from backend.feasibility import InfeasibleInputError
+
+
+class _UnionFind:
+	def __init__(self):
+		self.parent: Dict[Tuple[str, int], Tuple[str, int]] = {}
+
+	def find(self, node: Tuple[str, int]) -> Tuple[str, int]:
+		self.parent.setdefault(node, node)
+		root = node
+		while self.parent[root] != root:
+			root = self.parent[root]
+		# Path compression
+		while self.parent[node] != root:
+			self.parent[node], node = root, self.parent[node]
+		return root
+
+	def union(self, a: Tuple[str, int], b: Tuple[str, int]):
+		ra, rb = self.find(a), self.find(b)
+		if ra != rb:
+			self.parent[rb] = ra
+
+
+def find_components(db: Session, batch_ids: Optional[List[int]] = None) -> List[List[int]]:
+	"""Split batches into groups that share no teachers and no rooms.
+
+	Nodes are batches, teachers and rooms; a batch is linked to the teacher of
+	each of its offerings and to every room it is eligible for (see
+	`eligible_rooms`). Components are returned largest first.
+	"""
+	query = db.query(SubjectOffering.batch_id, SubjectOffering.teacher_id, Subject.is_lab).join(
+		Subject, Subject.subject_id == SubjectOffering.subject_id
+	)
+	if batch_ids:
+		query = query.filter(SubjectOffering.batch_id.in_(batch_ids))
+	rows = query.all()
+	rooms = db.query(Room).all()
+
+	uf = _UnionFind()
+	needs: Dict[int, Dict[str, bool]] = {}
+	for batch_id, teacher_id, is_lab in rows:
+		uf.union(("batch", batch_id), ("teacher", teacher_id))
+		kinds = needs.setdefault(batch_id, {"lab": False, "class": False})
+		kinds["lab" if is_lab else "class"] = True
+
+	for batch_id, kinds in needs.items():
+		lab_rooms, class_rooms = eligible_rooms(rooms, batch_id)
+		linked = (lab_rooms if kinds["lab"] else []) + (class_rooms if kinds["class"] else [])
+		for room in linked:
+			uf.union(("batch", batch_id), ("room", room.room_id))
+
+	components: Dict[Tuple[str, int], List[int]] = {}
+	for batch_id in sorted(needs):
+		components.setdefault(uf.find(("batch", batch_id)), []).append(batch_id)
+	return sorted(components.values(), key=len, reverse=True)
+
+
+def _init_worker():
+	"""Give each worker process its own connection pool"""
+	from backend.database import engine
+	engine.dispose()
+
+
+def _solve_component(
+	batch_ids: List[int],
+	num_workers: int,
+	profile: Optional[str] = None,
+	time_limit: Optional[float] = None,
+	objective_mode: Optional[str] = None,
+) -> Tuple[List[int], Optional[Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]], Dict[str, Any]]:
+	"""Solve one component in a worker process; entries and run metrics are returned, not persisted"""
+	from backend.database import SessionLocal
+	db = SessionLocal()
+	try:
+		scheduler = TimetableScheduler(db, batch_ids=batch_ids, num_workers=num_workers, profile=profile, time_limit=time_limit, objective_mode=objective_mode)
+		if not scheduler.offerings or not scheduler.teachers or not scheduler.rooms:
+			return batch_ids, {batch_id: {} for batch_id in batch_ids}, scheduler.metrics()
+		solutions = scheduler.solve()
+		return batch_ids, solutions, scheduler.metrics()
+	finally:
+		db.close()
+
+
+def generate_components(
+	db: Session,
+	batch_ids: Optional[List[int]] = None,
+	max_processes: Optional[int] = None,
+	profile: Optional[str] = None,
+	time_limit: Optional[float] = None,
+	objective_mode: Optional[str] = None,
+) -> Tuple[List[Timetable], List[SchedulerRun]]:
+	"""Regenerate batches component by component, solving components in parallel.
+
+	Returns the timetables sorted by batch and the run log row of each
+	component. A component without a solution gets a "failed" run and no
+	timetables.
+	"""
+	components = find_components(db, batch_ids)
+	if not components:
+		return [], []
+
+	# Pre-check every component up front so no process is spawned for a doomed request
+	issues = []
+	for component in components:
+		issues.extend(feasibility.check(TimetableScheduler(db, batch_ids=component)))
+	if issues:
+		raise InfeasibleInputError(issues)
+
+	cpu_count = os.cpu_count() or 1
+	processes = min(len(components), max_processes or cpu_count)
+	# Split the machine's cores between the concurrently running CP-SAT solves
+	workers_per_solve = max(1, cpu_count // processes)
+	print(f"🧩 {len(components)} independent component(s), solving {processes} at a time with {workers_per_solve} worker(s) each")
+
+	results: List[Tuple[List[int], Optional[Dict], Dict[str, Any]]] = []
+	if processes == 1:
+		for component in components:
+			results.append(_solve_component(component, workers_per_solve, profile, time_limit, objective_mode))
+	else:
+		context = multiprocessing.get_context("spawn")
+		with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_worker) as pool:
+			futures = [pool.submit(_solve_component, component, workers_per_solve, profile, time_limit, objective_mode) for component in components]
+			for future in as_completed(futures):
+				results.append(future.result())
+
+	timetables: List[Timetable] = []
+	runs: List[SchedulerRun] = []
+	for component, solutions, metrics in results:
+		if solutions is None:
+			# Nothing is written for a failed component; only its run is logged
+			print(f"❌ No solution found for component {component}")
+			runs.append(run_log.record(db, metrics, component, "failed"))
+			continue
+		start = time.perf_counter()
+		component_tts = persist_timetables(db, solutions)
+		metrics["timings"]["persist"] = round(time.perf_counter() - start, 4)
+		timetable_ids = [component_tts[batch_id].timetable_id for batch_id in component]
+		runs.append(run_log.record(db, metrics, component, "generated", timetable_ids))
+		timetables.extend(component_tts.values())
+	return sorted(timetables, key=lambda tt: tt.batch_id), runs
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func  # type: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
-from typing import Dict, Any
-from sqlalchemy import select  # type: ignore[reportMissingImports]
+from typing import Dict, Any, List, Optional, Literal
+import json
+import queue
+import threading
+import uuid
 
-from backend.database import get_db
-from backend.models import Timetable, TimetableEntry, Subject, Teacher, Room, DayOfWeek
-from backend.scheduler import generate_timetable
+from backend.database import get_db, SessionLocal
+from backend.models import Timetable, TimetableEntry, Subject, Teacher, Room, SubjectOffering, DayOfWeek, GenerationJob, SchedulerRun
+from backend.scheduler import TimetableScheduler, NoSolutionError, SOLVER_PROFILES, OBJECTIVE_MODES, POOL_MAX_SIZE, POOL_MIN_DISTANCE
+from backend.planner import generate_components
+from backend.feasibility import InfeasibleInputError
+from backend import solution_cache, jobs, run_log, occupancy, moves, anytime
+from backend.scheduler import persist_timetables
+from backend.slot_grid import GRID, half_of
 
 router = APIRouter(prefix="/timetables", tags=["timetables"])
 
-
-def half_of(period: int) -> str:
-	return "AM" if period <= 4 else "PM"
+# Streaming solves in progress, by run id, so clients can stop them early
+_streams: Dict[str, TimetableScheduler] = {}
 
 
 def serialize(obj) -> Dict[str, Any]:
@@ -26,53 +36,168 @@ def serialize(obj) -> Dict[str, Any]:
 	return data
 
 
+def solver_options(
+	profile: Optional[str] = Query(None, description=f"Solver profile: {', '.join(SOLVER_PROFILES)}"),
+	time_limit: Optional[float] = Query(None, gt=0, description="Solve time budget in seconds, capped by the server"),
+	objective_mode: Optional[str] = Query(None, description=f"How objectives are combined: {', '.join(OBJECTIVE_MODES)}"),
+) -> Dict[str, Any]:
+	"""Per-request solver profile, time budget and objective mode, passed on to TimetableScheduler"""
+	if profile is not None and profile not in SOLVER_PROFILES:
+		raise HTTPException(status_code=400, detail=f"Unknown solver profile '{profile}', expected one of {list(SOLVER_PROFILES)}")
+	if objective_mode is not None and objective_mode not in OBJECTIVE_MODES:
+		raise HTTPException(status_code=400, detail=f"Unknown objective mode '{objective_mode}', expected one of {list(OBJECTIVE_MODES)}")
+	return {"profile": profile, "time_limit": time_limit, "objective_mode": objective_mode}
+
+
+def infeasible(e: InfeasibleInputError) -> HTTPException:
+	"""422 carrying the structured pre-check issues"""
+	return HTTPException(status_code=422, detail={"message": str(e), "issues": e.issues})
+
+
+def booked_meanwhile(e: occupancy.OccupancyClashError) -> HTTPException:
+	"""409 listing the teacher and room slots other batches booked during the solve"""
+	return HTTPException(status_code=409, detail={"message": str(e), "clashes": e.detail()})
+
+
+def no_solution(e: NoSolutionError) -> HTTPException:
+	"""422 for a solve that found nothing; the attempt is only in the run log"""
+	return HTTPException(status_code=422, detail={"message": str(e), "run": serialize(e.run) if e.run else None})
+
+
 @router.get("")
-def list_timetables(db: Session = Depends(get_db)):
+def list_timetables(
+	db: Session = Depends(get_db),
+	status: Optional[str] = Query(None, description="Only timetables with this status; candidates are excluded by default"),
+):
 	try:
-		tts = db.query(Timetable).all()
+		query = db.query(Timetable)
+		query = query.filter(Timetable.status == status) if status else query.filter(Timetable.status != "candidate")
+		tts = query.all()
 		return [serialize(tt) for tt in tts]
 	except Exception as e:
 		print(f"Error listing timetables: {e}")
 		raise HTTPException(status_code=500, detail=f"Failed to list timetables: {str(e)}")
 
 
+@router.get("/cache/stats")
+def cache_stats(db: Session = Depends(get_db)):
+	"""Solution cache hit/miss counters and size"""
+	return solution_cache.stats(db)
+
+
+@router.delete("/cache")
+def clear_cache(db: Session = Depends(get_db)):
+	"""Drop every cached solution"""
+	removed = solution_cache.clear(db)
+	return {"message": "Solution cache cleared", "removed": removed}
+
+
+@router.get("/runs")
+def list_runs(db: Session = Depends(get_db), limit: int = Query(50, ge=1, le=500)):
+	"""Most recent generation runs with their timings, model size and solver stats"""
+	runs = db.query(SchedulerRun).order_by(SchedulerRun.run_id.desc()).limit(limit).all()
+	return [serialize(run) for run in runs]
+
+
+@router.get("/runs/stats")
+def run_stats(db: Session = Depends(get_db)):
+	"""Aggregate of every recorded run: counts by status, mean and max per phase"""
+	return run_log.summary(db)
+
+
+@router.get("/batch/{batch_id}/latest")
+def get_latest_timetable(batch_id: int, db: Session = Depends(get_db)):
+	"""The batch's latest generated timetable, at its latest published version"""
+	tid = db.query(func.max(Timetable.timetable_id)).filter(
+		Timetable.batch_id == batch_id,
+		Timetable.status == "generated",
+	).scalar()
+	if tid is None:
+		raise HTTPException(status_code=404, detail="No timetable for this batch")
+	return get_timetable(tid, db)
+
+
+@router.get("/anytime/{timetable_id}")
+def get_anytime_run(timetable_id: int):
+	"""Progress of the background improvement of a timetable"""
+	run = anytime.get(timetable_id)
+	if not run:
+		raise HTTPException(status_code=404, detail="No anytime run for this timetable")
+	return run.state()
+
+
+@router.post("/anytime/{timetable_id}/stop")
+def stop_anytime_run(timetable_id: int):
+	"""Stop improving; the best solution found so far becomes the last version"""
+	run = anytime.get(timetable_id)
+	if not run:
+		raise HTTPException(status_code=404, detail="No anytime run for this timetable")
+	run.stop()
+	return run.state()
+
+
+def timetable_entries(db: Session, timetable_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+	"""Entries of each timetable, enriched with subject, teacher and room names"""
+	entries = db.query(TimetableEntry).filter(TimetableEntry.timetable_id.in_(timetable_ids)).all()
+	# Enrich names
+	sub_map = {s.subject_id: s.subject_name for s in db.query(Subject).all()}
+	teacher_map = {t.teacher_id: t.teacher_name for t in db.query(Teacher).all()}
+	room_map = {r.room_id: r.room_name for r in db.query(Room).all()}
+
+	by_timetable: Dict[int, List[Dict[str, Any]]] = {tid: [] for tid in timetable_ids}
+	for e in entries:
+		by_timetable[e.timetable_id].append({
+			**serialize(e),
+			"subject_name": sub_map.get(e.subject_id),
+			"teacher_name": teacher_map.get(e.teacher_id),
+			"room_name": room_map.get(e.room_id),
+			"half_day": half_of(e.period_number),
+		})
+	return by_timetable
+
+
+def discard_candidates(db: Session, batch_id: int, keep: Optional[int] = None) -> List[int]:
+	"""Delete the batch's candidate timetables except `keep`; the caller commits"""
+	ids = [
+		tid for (tid,) in db.query(Timetable.timetable_id).filter(
+			Timetable.batch_id == batch_id,
+			Timetable.status == "candidate",
+			Timetable.timetable_id != keep,
+		)
+	]
+	if ids:
+		db.query(TimetableEntry).filter(TimetableEntry.timetable_id.in_(ids)).delete(synchronize_session=False)
+		db.query(Timetable).filter(Timetable.timetable_id.in_(ids)).delete(synchronize_session=False)
+	return ids
+
+
 @router.get("/{tid}")
 def get_timetable(tid: int, db: Session = Depends(get_db)):
 	try:
 		tt = db.query(Timetable).filter(Timetable.timetable_id == tid).first()
-		if not tt:
+		# Candidates are only shown in the /generate/options response until adopted
+		if not tt or tt.status == "candidate":
 			raise HTTPException(status_code=404, detail="Not found")
-		entries = db.query(TimetableEntry).filter(TimetableEntry.timetable_id == tt.timetable_id).all()
-		# Enrich names
-		sub_map = {s.subject_id: s.subject_name for s in db.query(Subject).all()}
-		teacher_map = {t.teacher_id: t.teacher_name for t in db.query(Teacher).all()}
-		room_map = {r.room_id: r.room_name for r in db.query(Room).all()}
-
-		return {
-			"timetable": serialize(tt),
-			"entries": [
-				{
-					**serialize(e),
-					"subject_name": sub_map.get(e.subject_id),
-					"teacher_name": teacher_map.get(e.teacher_id),
-					"room_name": room_map.get(e.room_id),
-					"half_day": half_of(e.period_number),
-				}
-				for e in entries
-			],
-		}
+		return {"timetable": serialize(tt), "entries": timetable_entries(db, [tid])[tid]}
+	except HTTPException:
+		raise
 	except Exception as e:
 		print(f"Error getting timetable {tid}: {e}")
 		raise HTTPException(status_code=500, detail=f"Failed to get timetable: {str(e)}")
 
 
 @router.post("/generate")
-def generate(db: Session = Depends(get_db), batch_id: int = 1):
+def generate(db: Session = Depends(get_db), batch_id: int = 1, options: Dict[str, Any] = Depends(solver_options)):
 	try:
 		print(f"Generating timetable for batch_id: {batch_id}")
-		tt = generate_timetable(db, batch_id=batch_id)
+		scheduler = TimetableScheduler(db, batch_id, **options)
+		tt = scheduler.generate()
 		print(f"Generated timetable: {tt.timetable_id}")
-		return serialize(tt)
+		return {**serialize(tt), "run": serialize(scheduler.run)}
+	except InfeasibleInputError as e:
+		raise infeasible(e)
+	except NoSolutionError as e:
+		raise no_solution(e)
 	except Exception as e:
 		print(f"Error generating timetable: {e}")
 		import traceback
@@ -80,22 +205,308 @@ def generate(db: Session = Depends(get_db), batch_id: int = 1):
 		raise HTTPException(status_code=500, detail=f"Failed to generate timetable: {str(e)}")
 
 
+@router.post("/generate/anytime")
+def generate_anytime(db: Session = Depends(get_db), batch_id: int = 1, options: Dict[str, Any] = Depends(solver_options)):
+	"""Return the first feasible timetable (version 1) and keep improving it in the background.
+
+	`time_limit` is the improvement budget (default ANYTIME_BUDGET_SECONDS).
+	Better solutions are published as new versions of the same timetable; poll
+	/timetables/anytime/{timetable_id} or read /timetables/batch/{batch_id}/latest.
+	"""
+	try:
+		run = anytime.generate(batch_id, **options)
+		tt = db.get(Timetable, run.timetable_id)
+		return {**serialize(tt), "anytime": run.state()}
+	except InfeasibleInputError as e:
+		raise infeasible(e)
+	except NoSolutionError as e:
+		raise no_solution(e)
+	except occupancy.OccupancyClashError as e:
+		raise booked_meanwhile(e)
+	except Exception as e:
+		print(f"Error generating timetable: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to generate timetable: {str(e)}")
+
+
+@router.post("/generate/options")
+def generate_options(
+	db: Session = Depends(get_db),
+	batch_id: int = 1,
+	k: int = Query(3, ge=2, le=POOL_MAX_SIZE, description="Number of alternative timetables"),
+	min_distance: int = Query(POOL_MIN_DISTANCE, ge=1, description="Sessions each option must place differently from every other"),
+	options: Dict[str, Any] = Depends(solver_options),
+):
+	"""Generate up to `k` distinct alternative timetables from one model, best first.
+
+	Options are stored with status "candidate" and occupy nothing until one is
+	adopted via /timetables/candidates/{timetable_id}/adopt. They replace any
+	options of the batch that were never adopted.
+	"""
+	try:
+		scheduler = TimetableScheduler(db, batch_id, **options)
+		try:
+			scheduler.check_feasibility()
+		except InfeasibleInputError:
+			scheduler.record_run("infeasible")
+			raise
+		if not scheduler.offerings or not scheduler.teachers or not scheduler.rooms:
+			raise HTTPException(status_code=400, detail="No subject offerings to schedule")
+		candidates = scheduler.solve_pool(k, min_distance)
+		if candidates is None:
+			raise NoSolutionError([batch_id], scheduler.record_run("failed"))
+		discard_candidates(db, batch_id)
+		timetables = [persist_timetables(db, candidate["solutions"], status="candidate") for candidate in candidates]
+		scheduler.record_run("generated", timetables[0])
+		entries = timetable_entries(db, [tts[batch_id].timetable_id for tts in timetables])
+		return {
+			"candidates": [
+				{
+					**serialize(tts[batch_id]),
+					**{key: candidate[key] for key in ("rank", "objective", "objectives", "distance")},
+					"entries": entries[tts[batch_id].timetable_id],
+				}
+				for candidate, tts in zip(candidates, timetables)
+			],
+			"run": serialize(scheduler.run),
+		}
+	except HTTPException:
+		raise
+	except InfeasibleInputError as e:
+		raise infeasible(e)
+	except NoSolutionError as e:
+		raise no_solution(e)
+	except Exception as e:
+		print(f"Error generating timetable options: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to generate timetable options: {str(e)}")
+
+
+@router.post("/candidates/{timetable_id}/adopt")
+def adopt_candidate(timetable_id: int, db: Session = Depends(get_db)):
+	"""Make a candidate the batch's current timetable and drop the other candidates"""
+	tt = db.get(Timetable, timetable_id)
+	if not tt or tt.status != "candidate":
+		raise HTTPException(status_code=404, detail="Candidate timetable not found")
+	newer = db.query(Timetable.timetable_id).filter(
+		Timetable.batch_id == tt.batch_id,
+		Timetable.status == "generated",
+		Timetable.timetable_id > timetable_id,
+	).first()
+	if newer:
+		# None of the batch's candidates can be adopted any more
+		discard_candidates(db, tt.batch_id)
+		db.commit()
+		raise HTTPException(status_code=409, detail="A newer timetable was generated for this batch; generate new options")
+	clashes = occupancy.clashes(db, tt.batch_id, timetable_id)
+	if clashes:
+		raise HTTPException(
+			status_code=409,
+			detail={
+				"message": "Other batches have since booked teachers or rooms this candidate uses",
+				"clashes": [{"kind": kind, "id": entity_id, "day": day.value, "period": period} for kind, entity_id, day, period in clashes],
+			},
+		)
+	
+	others = discard_candidates(db, tt.batch_id, keep=timetable_id)
+	tt.status = "generated"
+	occupancy.touch(db, [tt.batch_id])
+	db.commit()
+	occupancy.forget([tt.batch_id])
+	return {"message": "Candidate adopted", "timetable": serialize(tt), "discarded": others}
+
+
+@router.api_route("/generate/stream", methods=["GET", "POST"])
+def generate_stream(
+	batch_id: int = 1,
+	include_assignment: bool = False,
+	stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+	options: Dict[str, Any] = Depends(solver_options),
+):
+	"""Generate a timetable and stream every improving solution (NDJSON or SSE).
+
+	Events carry objective value, best bound and elapsed time, plus the current
+	assignment when `include_assignment` is set. POST
+	/timetables/generate/stream/{run_id}/stop accepts the current best solution;
+	the final `done` event carries the persisted timetable.
+	"""
+	run_id = uuid.uuid4().hex
+	events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+
+	def run():
+		db = SessionLocal()
+		try:
+			scheduler = TimetableScheduler(db, batch_id, progress_callback=events.put, stream_assignment=include_assignment, **options)
+			_streams[run_id] = scheduler
+			tt = scheduler.generate()
+			events.put({"event": "done", "timetable": serialize(tt), "run": serialize(scheduler.run)})
+		except InfeasibleInputError as e:
+			events.put({"event": "error", "detail": str(e), "issues": e.issues})
+		except NoSolutionError as e:
+			events.put({"event": "error", "detail": str(e), "run": serialize(e.run) if e.run else None})
+		except Exception as e:
+			print(f"Error streaming timetable generation: {e}")
+			events.put({"event": "error", "detail": str(e)})
+		finally:
+			_streams.pop(run_id, None)
+			db.close()
+			events.put(None)
+
+	def encode(event: Dict[str, Any]) -> str:
+		data = json.dumps(jsonable_encoder(event))
+		if stream_format == "sse":
+			return f"event: {event['event']}\ndata: {data}\n\n"
+		return data + "\n"
+
+	def body():
+		try:
+			yield encode({"event": "started", "run_id": run_id, "batch_id": batch_id})
+			while True:
+				event = events.get()
+				if event is None:
+					break
+				yield encode(event)
+		finally:
+			# Client went away early: stop the search so its cores are freed
+			scheduler = _streams.get(run_id)
+			if scheduler:
+				scheduler.stop()
+
+	threading.Thread(target=run, daemon=True).start()
+	media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+	return StreamingResponse(body(), media_type=media_type)
+
+
+@router.post("/generate/stream/{run_id}/stop")
+def stop_stream(run_id: str):
+	"""Accept the best solution found so far by a streaming generation"""
+	scheduler = _streams.get(run_id)
+	if not scheduler:
+		raise HTTPException(status_code=404, detail="No running generation with this id")
+	scheduler.stop()
+	return {"message": "Stop requested; the best solution found so far will be kept", "run_id": run_id}
+
+
+@router.post("/generate-all")
+def generate_all_timetables(
+	db: Session = Depends(get_db),
+	batch_ids: Optional[List[int]] = Query(None),
+	parallel: bool = False,
+	options: Dict[str, Any] = Depends(solver_options),
+):
+	"""Generate timetables for several batches (default: every batch with offerings).
+
+	By default all batches share one joint solve; with `parallel` the batches are
+	split into components that share no teachers or rooms, each solved in its
+	own process.
+	"""
+	try:
+		if not batch_ids:
+			batch_ids = sorted({bid for (bid,) in db.query(SubjectOffering.batch_id).distinct()})
+		if not batch_ids:
+			raise HTTPException(status_code=400, detail="No batches with subject offerings to schedule")
+		if parallel:
+			print(f"Generating timetables per component for batch_ids: {batch_ids}")
+			tts, runs = generate_components(db, batch_ids=batch_ids, **options)
+		else:
+			print(f"Generating timetables jointly for batch_ids: {batch_ids}")
+			scheduler = TimetableScheduler(db, batch_ids=batch_ids, **options)
+			tts = scheduler.generate_all()
+			runs = [scheduler.run]
+		run_by_batch = {int(bid): run for run in runs for bid in run.batch_ids.split(",")}
+		generated = {tt.batch_id for tt in tts}
+		# Batches of a failed component have no timetable, only their run
+		failed = [
+			{"batch_id": batch_id, "status": "failed", "run": serialize(run_by_batch[batch_id])}
+			for batch_id in sorted(run_by_batch) if batch_id not in generated
+		]
+		return [{**serialize(tt), "run": serialize(run_by_batch[tt.batch_id])} for tt in tts] + failed
+	except HTTPException:
+		raise
+	except InfeasibleInputError as e:
+		raise infeasible(e)
+	except NoSolutionError as e:
+		raise no_solution(e)
+	except Exception as e:
+		print(f"Error generating timetables: {e}")
+		import traceback
+		traceback.print_exc()
+		raise HTTPException(status_code=500, detail=f"Failed to generate timetables: {str(e)}")
+
+
+@router.post("/jobs")
+def submit_generation_job(db: Session = Depends(get_db), batch_id: int = 1):
+	"""Queue a generation job on the worker pool and return immediately"""
+	try:
+		job = jobs.submit_job(db, batch_id)
+		return serialize(job)
+	except Exception as e:
+		print(f"Error submitting generation job: {e}")
+		raise HTTPException(status_code=500, detail=f"Failed to submit generation job: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+def get_generation_job(job_id: int, db: Session = Depends(get_db)):
+	job = db.get(GenerationJob, job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail="Job not found")
+	return serialize(job)
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_generation_job(job_id: int, db: Session = Depends(get_db)):
+	job = db.get(GenerationJob, job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail="Job not found")
+	return serialize(jobs.cancel_job(db, job))
+
+
+@router.get("/jobs/{job_id}/result")
+def get_generation_job_result(job_id: int, db: Session = Depends(get_db)):
+	job = db.get(GenerationJob, job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail="Job not found")
+	if job.status == "infeasible":
+		raise HTTPException(status_code=422, detail=json.loads(job.error))
+	if job.status != "completed" or job.timetable_id is None:
+		raise HTTPException(status_code=409, detail=f"Job is {job.status}, no result available")
+	return get_timetable(job.timetable_id, db)
+
+
 @router.post("/regenerate/{batch_id}")
-def regenerate_timetable(batch_id: int, db: Session = Depends(get_db)):
-	"""Regenerate timetable for a batch (deletes existing and creates new)"""
+def regenerate_timetable(
+	batch_id: int,
+	db: Session = Depends(get_db),
+	warm_start: bool = True,
+	repair_hint: bool = True,
+	options: Dict[str, Any] = Depends(solver_options),
+):
+	"""Regenerate timetable for a batch (creates a new one, then deletes the existing ones).
+
+	The new solve is warm-started from the current timetable, so small edits to
+	the offerings only need a small repair of the previous schedule.
+	"""
 	try:
-		# Delete existing timetable for this batch
-		existing_tt = db.query(Timetable).filter(Timetable.batch_id == batch_id).first()
-		if existing_tt:
+		existing_ids = [tid for (tid,) in db.query(Timetable.timetable_id).filter(Timetable.batch_id == batch_id)]
+		
+		# Generate new timetable while the previous one is still available as a hint
+		scheduler = TimetableScheduler(db, batch_id, warm_start=warm_start, repair_hint=repair_hint, **options)
+		tt = scheduler.generate()
+		
+		# Delete the previous timetables of this batch (generate() raised if the solve failed)
+		if existing_ids:
 			# Delete all entries first
-			db.query(TimetableEntry).filter(TimetableEntry.timetable_id == existing_tt.timetable_id).delete()
-			# Delete the timetable
-			db.delete(existing_tt)
+			db.query(TimetableEntry).filter(TimetableEntry.timetable_id.in_(existing_ids)).delete(synchronize_session=False)
+			# Delete the timetables
+			db.query(Timetable).filter(Timetable.timetable_id.in_(existing_ids)).delete(synchronize_session=False)
+			occupancy.touch(db, [batch_id])
 			db.commit()
 		
-		# Generate new timetable
-		tt = generate_timetable(db, batch_id=batch_id)
-		return {"message": "Timetable regenerated successfully", "timetable": serialize(tt)}
+		return {"message": "Timetable regenerated successfully", "timetable": serialize(tt), "run": serialize(scheduler.run)}
+	except InfeasibleInputError as e:
+		db.rollback()
+		raise infeasible(e)
+	except NoSolutionError as e:
+		db.rollback()
+		raise no_solution(e)
 	except Exception as e:
 		print(f"Error regenerating timetable: {e}")
 		import traceback
@@ -111,75 +522,46 @@ def delete_timetable(timetable_id: int, db: Session = Depends(get_db)):
 	if not tt:
 		raise HTTPException(status_code=404, detail="Timetable not found")
 	
+	batch_id = tt.batch_id
 	# Delete all entries first
 	db.query(TimetableEntry).filter(TimetableEntry.timetable_id == timetable_id).delete()
 	# Delete the timetable
 	db.delete(tt)
+	occupancy.touch(db, [batch_id])
 	db.commit()
+	occupancy.forget([batch_id])
 	return {"message": "Timetable deleted successfully"}
 
 
 @router.patch("/update/{entry_id}")
 def update_entry(entry_id: int, payload: Dict[str, Any], db: Session = Depends(get_db)):
 	entry = db.get(TimetableEntry, entry_id)
-	if not entry:
+	if not entry or entry.timetable.status == "candidate":
 		raise HTTPException(status_code=404, detail="Not found")
 
-	new_day = payload.get("day_of_week", entry.day_of_week)
-	new_period = payload.get("period_number", entry.period_number)
-
-	# Validate half-day separation for the same subject within a day
-	if entry.subject_id is not None:
-		conflict = db.scalars(
-			select(TimetableEntry)
-			.where(
-				TimetableEntry.timetable_id == entry.timetable_id,
-				TimetableEntry.day_of_week == new_day,
-				TimetableEntry.subject_id == entry.subject_id,
-			)
-		).all()
-		for e in conflict:
-			if e.entry_id == entry.entry_id:
-				continue
-			if half_of(e.period_number) == half_of(new_period):
-				raise HTTPException(status_code=400, detail="Subject already scheduled in this half-day. Pick the other half.")
-
-	# Validate lab cross-batch half-day conflict for same teacher
-	if entry.teacher_id is not None and entry.subject_id is not None:
-		sub = db.get(Subject, entry.subject_id)
-		if sub and sub.is_lab:
-			other = db.scalars(
-				select(TimetableEntry)
-				.join(Timetable)
-				.where(
-					Timetable.batch_id != db.get(Timetable, entry.timetable_id).batch_id,
-					TimetableEntry.teacher_id == entry.teacher_id,
-					TimetableEntry.day_of_week == new_day,
-				)
-			).all()
-			for e in other:
-				other_sub = db.get(Subject, e.subject_id) if e.subject_id else None
-				if other_sub and other_sub.is_lab and half_of(e.period_number) == half_of(new_period):
-					raise HTTPException(status_code=400, detail="This teacher has a lab in the same half-day for another class.")
-
-	# Validate teacher availability
-	if entry.teacher_id is not None:
-		busy = db.scalars(
-			select(TimetableEntry)
-			.where(
-				TimetableEntry.entry_id != entry.entry_id,
-				TimetableEntry.teacher_id == entry.teacher_id,
-				TimetableEntry.day_of_week == new_day,
-				TimetableEntry.period_number == new_period,
-			)
-		).first()
-		if busy:
-			raise HTTPException(status_code=400, detail="Teacher is busy this period.")
+	try:
+		new_day = DayOfWeek(payload.get("day_of_week", entry.day_of_week))
+		new_period = int(payload.get("period_number", entry.period_number))
+	except (TypeError, ValueError):
+		raise HTTPException(status_code=400, detail="Invalid day or period")
+	if not GRID.contains(new_day, new_period):
+		raise HTTPException(status_code=400, detail="Invalid day or period")
+
+	violations = moves.check(db, entry, new_day, new_period)
+	if violations:
+		raise HTTPException(
+			status_code=400,
+			detail={"message": " ".join(v["message"] for v in violations), "violations": violations},
+		)
 
+	old_slot = (entry.day_of_week, entry.period_number)
 	setattr(entry, "day_of_week", new_day)
 	setattr(entry, "period_number", new_period)
+	batch_id = entry.timetable.batch_id
+	versions = occupancy.touch(db, [batch_id])
 	db.commit()
 	db.refresh(entry)
+	occupancy.move(batch_id, entry.timetable_id, versions[batch_id], entry.teacher_id, entry.room_id, old_slot, (entry.day_of_week, entry.period_number), entry.is_lab_session)
 	return serialize(entry)
 
 
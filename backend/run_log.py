@@ -0,0 +1,79 @@
+"""
+Per-run instrumentation of timetable generation.
+
+Every scheduler run stores its phase durations, model size and CP-SAT
+statistics in the scheduler_runs table, so regressions show up in the
+aggregate and hardware can be sized from real workloads.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func  # type: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend.models.models import SchedulerRun
+
+# Timed phases, in execution order; each maps to a <phase>_seconds column
+PHASES = (
+	"load",
+	"rooms",
+	"precheck",
+	"variables",
+	"hard_constraints",
+	"soft_constraints",
+	"solve",
+	"extract",
+	"persist",
+	"total",
+)
+
+MODEL_STATS = ("num_variables", "num_constraints", "num_objective_terms")
+SOLVER_STATS = ("solver_status", "solver_wall_time", "num_conflicts", "num_branches", "objective_value", "best_bound")
+
+
+def record(
+	db: Session,
+	metrics: Dict[str, Any],
+	batch_ids: List[int],
+	status: str,
+	timetable_ids: Optional[List[int]] = None,
+) -> SchedulerRun:
+	"""Store the metrics of one run (as built by TimetableScheduler.metrics())"""
+	run = SchedulerRun(
+		batch_ids=",".join(str(b) for b in batch_ids),
+		timetable_ids=",".join(str(t) for t in timetable_ids) if timetable_ids else None,
+		status=status,
+		cache_hit=metrics.get("cache_hit", False),
+		num_offerings=metrics.get("num_offerings", 0),
+		profile=metrics.get("profile"),
+	)
+	for phase, seconds in metrics.get("timings", {}).items():
+		if phase in PHASES:
+			setattr(run, f"{phase}_seconds", seconds)
+	for key in MODEL_STATS:
+		setattr(run, key, metrics.get("model", {}).get(key))
+	for key in SOLVER_STATS:
+		setattr(run, key, metrics.get("solver", {}).get(key))
+	db.add(run)
+	db.commit()
+	db.refresh(run)
+	return run
+
+
+def summary(db: Session) -> Dict[str, Any]:
+	"""Aggregate all recorded runs: counts per status, and mean/max per phase and size"""
+	runs = db.query(func.count(SchedulerRun.run_id)).scalar() or 0
+	by_status = dict(db.query(SchedulerRun.status, func.count(SchedulerRun.run_id)).group_by(SchedulerRun.status).all())
+	cache_hits = db.query(func.count(SchedulerRun.run_id)).filter(SchedulerRun.cache_hit.is_(True)).scalar() or 0
+
+	columns = [f"{phase}_seconds" for phase in PHASES] + list(MODEL_STATS) + ["solver_wall_time", "num_conflicts", "num_branches"]
+	aggregates = db.query(*(
+		agg(getattr(SchedulerRun, column))
+		for column in columns
+		for agg in (func.avg, func.max)
+	)).one()
+	stats: Dict[str, Dict[str, Optional[float]]] = {}
+	for i, column in enumerate(columns):
+		mean, peak = aggregates[2 * i], aggregates[2 * i + 1]
+		stats[column] = {"mean": round(float(mean), 4) if mean is not None else None, "max": peak}
+	return {"runs": runs, "by_status": by_status, "cache_hits": cache_hits, "stats": stats}
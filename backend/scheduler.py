@@ -1,350 +1,747 @@
-from typing import List, Dict, Tuple, Set, Optional
+from typing import List, Dict, Tuple, Set, Optional, Callable, Any
+from sqlalchemy import insert  # type: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
 from datetime import datetime
-import random
 from collections import defaultdict
+from contextlib import contextmanager
+
+import os
+import time
+
+import numpy as np
 
 from ortools.sat.python import cp_model
 
-from backend.models.models import Timetable, TimetableEntry, Subject, Teacher, Room, SubjectOffering, DayOfWeek
+from backend.models.models import Timetable, TimetableEntry, Teacher, Room, SubjectOffering, DayOfWeek
+from backend import solution_cache, feasibility, run_log, occupancy, symmetry
+from backend.occupancy import OccupancyGrid
+from backend.slot_grid import GRID, DAYS, NUM_PERIODS, NUM_SLOTS
+from backend.feasibility import InfeasibleInputError
+from backend.scheduler_index import SchedulerIndex
+
+# Workload balancing formulation for Objective 2:
+#   pairwise - sum of |w_i - w_j| over all teacher pairs (O(T^2) variables)
+#   mean     - sum of |T * w_i - total| deviations from the mean (O(T) variables)
+#   spread   - max workload minus min workload (O(1) extra variables)
+BALANCE_MODES = ("pairwise", "mean", "spread")
+DEFAULT_BALANCE_MODE = os.getenv("SCHEDULER_BALANCE_MODE", "pairwise")
+
+# Rooms the solver may choose from per offering; caps model size when a batch
+# falls back to a large shared pool of unassigned rooms
+MAX_ROOM_CANDIDATES = int(os.getenv("SCHEDULER_ROOM_CANDIDATES", "3"))
+
+# Order interchangeable rooms and offerings so CP-SAT does not search symmetric
+# copies of the same timetable (see backend.symmetry); 0 turns it off
+SYMMETRY_BREAKING = os.getenv("SCHEDULER_SYMMETRY_BREAKING", "1") == "1"
+
+# How the objectives are combined:
+#   weighted - one solve minimizing the plain sum of every objective term
+#   staged   - lexicographic: a quick feasibility stage, then teacher gaps, then
+#              each secondary objective in its own time slice, fixing each
+#              stage's result as a bound for the next
+OBJECTIVE_MODES = ("weighted", "staged")
+DEFAULT_OBJECTIVE_MODE = os.getenv("SCHEDULER_OBJECTIVE_MODE", "weighted")
+# Objective groups in priority order, see _add_soft_constraints
+OBJECTIVE_STAGES = ("gaps", "balance", "rooms")
+# Staged mode: shares of the time budget; secondary stages split what is left
+STAGE_FEASIBILITY_SHARE = 0.1
+STAGE_PRIMARY_SHARE = 0.7
+
+# Solution pools (solve_pool): the first solve gets this share of the time
+# budget and every further candidate an equal share of the rest. Candidates
+# differ pairwise in at least POOL_MIN_DISTANCE placed sessions by default.
+POOL_FIRST_SHARE = 0.5
+POOL_MAX_SIZE = int(os.getenv("SCHEDULER_POOL_MAX_SIZE", "10"))
+POOL_MIN_DISTANCE = int(os.getenv("SCHEDULER_POOL_MIN_DISTANCE", "3"))
+
+# Named CP-SAT parameter sets: preview answers in seconds, thorough is meant for
+# overnight runs. num_workers 0 means every core the server allows.
+SOLVER_PROFILES: Dict[str, Dict[str, Any]] = {
+	"preview": {"max_time_in_seconds": 2.0, "num_workers": 4, "relative_gap_limit": 0.05, "random_seed": 1, "linearization_level": 0},
+	"balanced": {"max_time_in_seconds": 60.0, "num_workers": 0, "relative_gap_limit": 0.0, "random_seed": 1, "linearization_level": 1},
+	"thorough": {"max_time_in_seconds": 1800.0, "num_workers": 0, "relative_gap_limit": 0.0, "random_seed": 1, "linearization_level": 2},
+}
+DEFAULT_SOLVER_PROFILE = os.getenv("SCHEDULER_PROFILE", "balanced")
+# Server-side caps on what a request may ask for (0 workers: all cores)
+MAX_SOLVE_SECONDS = float(os.getenv("SCHEDULER_MAX_SECONDS", "1800"))
+MAX_SOLVE_WORKERS = int(os.getenv("SCHEDULER_MAX_WORKERS", "0"))
+
+
+def solver_parameters(
+	profile: str,
+	time_limit: Optional[float] = None,
+	num_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+	"""CP-SAT parameters of `profile` with per-request overrides, capped by the server limits"""
+	if profile not in SOLVER_PROFILES:
+		raise ValueError(f"Unknown solver profile '{profile}', expected one of {tuple(SOLVER_PROFILES)}")
+	params = dict(SOLVER_PROFILES[profile])
+	if time_limit:
+		params["max_time_in_seconds"] = float(time_limit)
+	if num_workers:
+		params["num_workers"] = num_workers
+	params["max_time_in_seconds"] = min(params["max_time_in_seconds"], MAX_SOLVE_SECONDS)
+	cores = os.cpu_count() or 1
+	worker_cap = min(MAX_SOLVE_WORKERS or cores, cores)
+	params["num_workers"] = min(params["num_workers"] or worker_cap, worker_cap)
+	return params
 
-DAYS = [DayOfWeek.Mon, DayOfWeek.Tue, DayOfWeek.Wed, DayOfWeek.Thu, DayOfWeek.Fri]
-PERIODS = list(range(1, 9))
-MORNING_PERIODS = [1, 2, 3, 4]  # Morning session periods
-AFTERNOON_PERIODS = [5, 6, 7, 8]  # Afternoon session periods
-MORNING_FIRST = 1
-AFTERNOON_FIRST = 5
 
+def is_lab_room(room: Room) -> bool:
+	return (room.room_type or "").upper().startswith("LAB")
 
-def half_of(period: int) -> str:
-	return "AM" if period <= 4 else "PM"
 
+def eligible_rooms(rooms: List[Room], batch_id: int) -> Tuple[List[Room], List[Room]]:
+	"""Return the (lab, classroom) rooms a batch may be scheduled in.
 
-def is_morning(period: int) -> bool:
-	return period <= 4
+	Batch-assigned rooms come first; unassigned rooms are only a fallback for a
+	room type the batch has none of, so batches owning their rooms never
+	compete for the shared pool.
+	"""
+	batch_rooms = [r for r in rooms if r.assigned_batch_id == batch_id]
+	unassigned_rooms = [r for r in rooms if r.assigned_batch_id is None]
+	
+	lab_rooms = [r for r in batch_rooms if is_lab_room(r)] or [r for r in unassigned_rooms if is_lab_room(r)]
+	class_rooms = [r for r in batch_rooms if not is_lab_room(r)] or [r for r in unassigned_rooms if not is_lab_room(r)]
+	
+	# If no specific rooms available, use any available rooms
+	if not lab_rooms:
+		lab_rooms = unassigned_rooms[:1] if unassigned_rooms else rooms[:1]
+	if not class_rooms:
+		class_rooms = unassigned_rooms[:1] if unassigned_rooms else rooms[:1]
+	return lab_rooms, class_rooms
 
 
-def is_afternoon(period: int) -> bool:
-	return period >= 5
+class SolutionProgressCallback(cp_model.CpSolverSolutionCallback):
+	"""Report every improving CP-SAT solution to `on_progress`"""
+
+	def __init__(
+		self,
+		scheduler: "TimetableScheduler",
+		on_progress: Callable[[Dict[str, Any]], None],
+		include_assignment: bool = False,
+		include_solutions: bool = False,
+	):
+		super().__init__()
+		self.scheduler = scheduler
+		self.on_progress = on_progress
+		self.include_assignment = include_assignment
+		self.include_solutions = include_solutions
+		self.solution_count = 0
+
+	def OnSolutionCallback(self):
+		self.solution_count += 1
+		event: Dict[str, Any] = {
+			"event": "solution",
+			"solution": self.solution_count,
+			"objective": self.ObjectiveValue(),
+			"best_bound": self.BestObjectiveBound(),
+			"elapsed": round(self.WallTime(), 3),
+		}
+		if self.scheduler.stage:
+			event["stage"] = self.scheduler.stage
+		if self.include_assignment:
+			offerings = self.scheduler.offerings
+			event["assignment"] = [
+				{"offering_id": offerings[pos].offering_id, "day_of_week": DAYS[day_index].value, "period_number": period}
+				for pos, day_index, period, _ in self.scheduler._solved_slots(self.scheduler._solution_values(self.Response())).tolist()
+			]
+		if self.include_solutions:
+			# Full entries per batch, ready to persist (see backend.anytime)
+			event["solutions"] = self.scheduler._extract_solution(self.Response())
+		self.on_progress(event)
 
 
 class TimetableScheduler:
-	def __init__(self, db: Session, batch_id: int):
+	def __init__(
+		self,
+		db: Session,
+		batch_id: Optional[int] = None,
+		batch_ids: Optional[List[int]] = None,
+		num_workers: Optional[int] = None,
+		warm_start: bool = False,
+		repair_hint: bool = False,
+		use_cache: bool = True,
+		progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+		stream_assignment: bool = False,
+		stream_solutions: bool = False,
+		balance_mode: Optional[str] = None,
+		profile: Optional[str] = None,
+		time_limit: Optional[float] = None,
+		objective_mode: Optional[str] = None,
+		symmetry_breaking: Optional[bool] = None,
+		persist_lock=None,
+	):
 		self.db = db
-		self.batch_id = batch_id
-		self.offerings = db.query(SubjectOffering).filter(SubjectOffering.batch_id == batch_id).all()
-		self.teachers = db.query(Teacher).all()
-		self.rooms = db.query(Room).all()
+		# Seconds spent in each phase of the run, reported in metrics()
+		self.timings: Dict[str, float] = {}
+		self._started = time.perf_counter()
+		self.cache_hit = False
+		# Fingerprint this run stored its solution under, if any
+		self.stored_cache_key: Optional[str] = None
+		self.balance_mode = balance_mode or DEFAULT_BALANCE_MODE
+		if self.balance_mode not in BALANCE_MODES:
+			raise ValueError(f"Unknown balance mode '{self.balance_mode}', expected one of {BALANCE_MODES}")
+		self.objective_mode = objective_mode or DEFAULT_OBJECTIVE_MODE
+		if self.objective_mode not in OBJECTIVE_MODES:
+			raise ValueError(f"Unknown objective mode '{self.objective_mode}', expected one of {OBJECTIVE_MODES}")
+		self.symmetry_breaking = SYMMETRY_BREAKING if symmetry_breaking is None else symmetry_breaking
+		self.use_cache = use_cache
+		# Lock shared by concurrent solvers (see backend.jobs): bookings made by other
+		# batches during the solve are re-checked under it just before persisting
+		self.persist_lock = persist_lock
+		# Called with a progress event each time the solver improves the solution
+		self.progress_callback = progress_callback
+		self.stream_assignment = stream_assignment
+		self.stream_solutions = stream_solutions
+		# Joint mode: several batches share one model (and one solver budget)
+		self.batch_ids = list(batch_ids) if batch_ids else [batch_id]
+		self.batch_id = self.batch_ids[0]
+		with self._phase("load"):
+			self.offerings = db.query(SubjectOffering).filter(SubjectOffering.batch_id.in_(self.batch_ids)).all()
+			self.teachers = db.query(Teacher).all()
+			self.rooms = db.query(Room).all()
+			
+			# Load existing teacher schedules from all batches
+			self._load_existing_schedules()
+			
+			# Previous entries of the batches being solved, used as a warm-start hint
+			self.previous_slots: Set[Tuple[int, int]] = self._load_previous_entries() if warm_start else set()
 		
 		# Initialize CP-SAT model
 		self.model = cp_model.CpModel()
 		self.solver = cp_model.CpSolver()
-		self.solver.parameters.max_time_in_seconds = 60.0  # 60 second timeout
-		
-		# Load existing teacher schedules from all batches
-		self._load_existing_schedules()
+		# Time limit, workers, gap, seed and linearization come from the solver profile
+		self.profile = profile or DEFAULT_SOLVER_PROFILE
+		self.solver_params = solver_parameters(self.profile, time_limit, num_workers)
+		for name, value in self.solver_params.items():
+			setattr(self.solver.parameters, name, value)
+		if repair_hint:
+			# Let CP-SAT repair a warm-start hint that became infeasible after an edit
+			self.solver.parameters.repair_hint = True
 		
 		# Partition rooms
-		self.lab_rooms = [r for r in self.rooms if (r.room_type or "").upper().startswith("LAB")]
-		self.class_rooms = [r for r in self.rooms if not (r.room_type or "").upper().startswith("LAB")]
+		self.lab_rooms = [r for r in self.rooms if is_lab_room(r)]
+		self.class_rooms = [r for r in self.rooms if not is_lab_room(r)]
 		if not self.lab_rooms:
 			self.lab_rooms = self.rooms[:1] if self.rooms else []
 		if not self.class_rooms:
 			self.class_rooms = self.rooms[:1] if self.rooms else []
 		
-		# Assign rooms to subjects
-		self.subject_room_map = self._assign_subject_rooms()
+		with self._phase("rooms"):
+			# Candidate rooms per offering; the solver picks one of them
+			self.room_candidates = self._candidate_rooms()
+			# Room of each offering: the preferred candidate until a solution picks one
+			self.offering_room_map = {oid: rooms[0] for oid, rooms in self.room_candidates.items()}
+			
+			# Grouping indexes shared by every constraint and objective builder
+			self.index = SchedulerIndex(self.offerings, self.teachers, self.rooms, self.room_candidates)
 		
-		# CP-SAT variables and constraints
-		self.variables = {}
+		# CP-SAT variables and constraints, keyed by GRID slot: variables[offering_id][slot]
+		self.variables: Dict[int, Dict[int, Any]] = {}
+		# Lab block starts: lab_starts[offering_id][start_slot]
+		self.lab_starts: Dict[int, Dict[int, cp_model.IntVar]] = {}
+		# Block starts covering each lab slot: lab_covering[offering_id][slot]
+		self.lab_covering: Dict[int, Dict[int, list]] = {}
+		# Room choice of offerings with several candidates: room_vars[offering_id][room_id]
+		self.room_vars: Dict[int, Dict[int, cp_model.IntVar]] = {}
+		# Flat layout of the placement literals (x vars and lab block starts) for bulk
+		# extraction: slot_var_index[i] is the model index of literal i, and
+		# slot_layout[i] = (offering position, day index, first period, periods covered)
+		self.slot_var_index = np.zeros(0, dtype=np.int64)
+		self.slot_layout = np.zeros((0, 4), dtype=np.int32)
+		# Same for room choices: room_layout[i] = (offering position, room_id)
+		self.room_var_index = np.zeros(0, dtype=np.int64)
+		self.room_layout = np.zeros((0, 2), dtype=np.int32)
 		self.constraints = []
 		self.objective_terms = []
+		# The same terms grouped by objective, keyed by OBJECTIVE_STAGES
+		self.objective_groups: Dict[str, list] = {}
+		# Symmetric classes found and constraints added, see backend.symmetry
+		self.symmetry_stats: Dict[str, int] = {}
+		# Scores of the candidates of the last solve_pool()
+		self.pool_stats: List[Dict[str, Any]] = []
+		# Stage being solved (staged mode), reported with progress events
+		self.stage: Optional[str] = None
+		# Solver response the solution is extracted from, and its statistics
+		self._response = None
+		self.solver_stats: Dict[str, Any] = {}
+		self._stopped = False
+		# Run log row of the last _run(), see record_run()
+		self.run = None
+
+	@contextmanager
+	def _phase(self, name: str):
+		"""Time a phase of the run; repeated phases accumulate"""
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.timings[name] = round(self.timings.get(name, 0.0) + time.perf_counter() - start, 4)
+
+	def metrics(self) -> Dict[str, Any]:
+		"""Phase timings, model size and solver statistics of this run"""
+		timings = dict(self.timings)
+		timings["total"] = round(time.perf_counter() - self._started, 4)
+		metrics: Dict[str, Any] = {
+			"batch_ids": self.batch_ids,
+			"num_offerings": len(self.offerings),
+			"cache_hit": self.cache_hit,
+			"profile": self.profile,
+			"objective_mode": self.objective_mode,
+			"timings": timings,
+			"model": {},
+			"solver": {},
+		}
+		if "variables" in self.timings:
+			proto = self.model.Proto()
+			metrics["model"] = {
+				"num_variables": len(proto.variables),
+				"num_constraints": len(proto.constraints),
+				"num_objective_terms": len(self.objective_terms),
+				"symmetry": self.symmetry_stats,
+			}
+		if "solve" in self.timings:
+			metrics["solver"] = dict(self.solver_stats)
+		if self.pool_stats:
+			metrics["pool"] = self.pool_stats
+		return metrics
 
 	def _load_existing_schedules(self):
-		"""Load existing teacher and room schedules from all batches to avoid conflicts"""
-		existing_entries = self.db.query(TimetableEntry).join(Timetable).filter(
-			Timetable.batch_id != self.batch_id
-		).all()
-		
-		# Track teacher conflicts
-		self.global_teacher_schedule: Dict[Tuple[int, DayOfWeek, int], bool] = {}
-		for entry in existing_entries:
-			if entry.teacher_id:
-				self.global_teacher_schedule[(entry.teacher_id, entry.day_of_week, entry.period_number)] = True
-		
-		# Track room conflicts (especially important for labs)
-		self.global_room_schedule: Dict[Tuple[int, DayOfWeek, int], bool] = {}
-		for entry in existing_entries:
-			if entry.room_id and entry.is_lab_session:  # Only track lab room conflicts
-				self.global_room_schedule[(entry.room_id, entry.day_of_week, entry.period_number)] = True
-
-	def _assign_subject_rooms(self) -> Dict[int, int]:
-		"""Assign appropriate rooms to subjects with batch-specific allocation"""
-		subject_room_map = {}
-		
-		# Get batch-assigned rooms first
-		batch_assigned_rooms = [r for r in self.rooms if r.assigned_batch_id == self.batch_id]
-		batch_lab_rooms = [r for r in batch_assigned_rooms if (r.room_type or "").upper().startswith("LAB")]
-		batch_class_rooms = [r for r in batch_assigned_rooms if not (r.room_type or "").upper().startswith("LAB")]
-		
-		# Fallback to unassigned rooms
-		unassigned_rooms = [r for r in self.rooms if r.assigned_batch_id is None]
-		unassigned_lab_rooms = [r for r in unassigned_rooms if (r.room_type or "").upper().startswith("LAB")]
-		unassigned_class_rooms = [r for r in unassigned_rooms if not (r.room_type or "").upper().startswith("LAB")]
-		
-		# Combine batch-assigned and unassigned rooms
-		available_lab_rooms = batch_lab_rooms + unassigned_lab_rooms
-		available_class_rooms = batch_class_rooms + unassigned_class_rooms
-		
-		# If no specific rooms available, use any available rooms
-		if not available_lab_rooms:
-			available_lab_rooms = unassigned_rooms[:1] if unassigned_rooms else self.rooms[:1]
-		if not available_class_rooms:
-			available_class_rooms = unassigned_rooms[:1] if unassigned_rooms else self.rooms[:1]
+		"""Load the busy teacher and room slots of every other batch to avoid conflicts"""
+		# Only each batch's latest generated timetable counts, served from the occupancy cache
+		self.teacher_occupancy: OccupancyGrid
+		self.room_occupancy: OccupancyGrid
+		self.teacher_occupancy, self.room_occupancy = occupancy.busy_grids(self.db, self.batch_ids)
+
+	def _load_previous_entries(self) -> Set[Tuple[int, int]]:
+		"""Map the latest timetable of each batch onto (offering_id, slot) pairs"""
+		offering_keys: Dict[Tuple, int] = {}
+		for offering in self.offerings:
+			offering_keys[(offering.batch_id, offering.subject_id, offering.teacher_id)] = offering.offering_id
+			offering_keys.setdefault((offering.batch_id, offering.subject_id), offering.offering_id)
 		
+		previous_slots: Set[Tuple[int, int]] = set()
+		for batch_id in self.batch_ids:
+			previous_tt = self.db.query(Timetable).filter(
+				Timetable.batch_id == batch_id,
+				Timetable.status == "generated",
+			).order_by(Timetable.generation_date.desc(), Timetable.timetable_id.desc()).first()
+			if not previous_tt:
+				continue
+			for entry in previous_tt.entries:
+				offering_id = offering_keys.get((batch_id, entry.subject_id, entry.teacher_id)) or offering_keys.get((batch_id, entry.subject_id))
+				if offering_id and GRID.contains(entry.day_of_week, entry.period_number):
+					previous_slots.add((offering_id, GRID.slot(entry.day_of_week, entry.period_number)))
+		return previous_slots
+
+	def _candidate_rooms(self) -> Dict[int, List[int]]:
+		"""Rooms each offering may be held in, preferred room first.
+
+		The pool is the batch's eligible rooms of the right type (batch-assigned
+		first, see eligible_rooms). It is rotated per batch so batches sharing a
+		pool prefer different rooms, then cut to MAX_ROOM_CANDIDATES. All offerings
+		of a batch and type share one list, since a batch only meets one class at
+		a time. The order only depends on ids, so it is the same in every process.
+		"""
+		room_candidates: Dict[int, List[int]] = {}
+		
+		offerings_by_batch = defaultdict(list)
 		for offering in self.offerings:
-			subject = offering.subject
-			if subject.is_lab and available_lab_rooms:
-				# For labs, try to assign a consistent room to avoid conflicts
-				room_index = hash(f"{self.batch_id}_{subject.subject_id}") % len(available_lab_rooms)
-				subject_room_map[subject.subject_id] = available_lab_rooms[room_index].room_id
-			elif available_class_rooms:
-				# For regular classes, assign based on batch and subject
-				room_index = hash(f"{self.batch_id}_{subject.subject_id}") % len(available_class_rooms)
-				subject_room_map[subject.subject_id] = available_class_rooms[room_index].room_id
-			elif self.rooms:
-				# Last resort: use any available room
-				subject_room_map[subject.subject_id] = self.rooms[0].room_id
-				
-		return subject_room_map
+			offerings_by_batch[offering.batch_id].append(offering)
+		
+		for batch_id in self.batch_ids:
+			available_lab_rooms, available_class_rooms = eligible_rooms(self.rooms, batch_id)
+			candidates = []
+			for rooms in (available_lab_rooms, available_class_rooms):
+				pool = sorted(r.room_id for r in rooms)
+				offset = batch_id % len(pool) if pool else 0
+				candidates.append((pool[offset:] + pool[:offset])[:MAX_ROOM_CANDIDATES])
+			lab_candidates, class_candidates = candidates
+			
+			for offering in offerings_by_batch[batch_id]:
+				rooms = lab_candidates if offering.subject.is_lab else class_candidates
+				if rooms:
+					room_candidates[offering.offering_id] = list(rooms)
+		
+		return room_candidates
+
+	def _allowed_slots(self, offering: SubjectOffering) -> np.ndarray:
+		"""Boolean mask of the slots an offering may use, pruned up front.
+
+		Slots where the teacher is busy in another batch, or where every candidate
+		room is booked by another batch, never get a variable.
+		"""
+		free = ~self.teacher_occupancy.busy(offering.teacher_id)
+		rooms = self.room_candidates.get(offering.offering_id, [])
+		if rooms:
+			# Some candidate room must be free as well
+			free &= ~np.logical_and.reduce([self.room_occupancy.busy(room_id) for room_id in rooms])
+		return free.ravel()
 
 	def _create_variables(self):
-		"""Create CP-SAT variables for each possible assignment"""
-		# Variable: x[offering_id][day][period] = 1 if offering is scheduled at (day, period)
+		"""Create CP-SAT variables only for the slots each offering may actually use"""
+		# Variable: x[offering_id][slot] = 1 if offering is scheduled at that slot. The
+		# dicts are sparse: a missing slot means the offering cannot be there.
+		labels = GRID.slot_label
+		for offering in self.index.non_lab_offerings:
+			offering_id = offering.offering_id
+			self.variables[offering_id] = {
+				slot: self.model.NewBoolVar(f"x_{offering_id}_{labels[slot]}")
+				for slot in np.flatnonzero(self._allowed_slots(offering)).tolist()
+			}
+		
+		# Labs are modelled by block starts: s[offering_id][slot] = 1 if a block of
+		# lab_duration periods starts at that slot. Only starts whose whole block fits
+		# in one session, and whose slots are all allowed, are created, so partial
+		# blocks, blocks across the lunch break and labs in first periods are impossible
+		# by construction (constraints 6 and 7). x[offering_id][slot] is then the sum
+		# of the starts covering the slot, present only where some start covers it.
+		for offering in self.index.lab_offerings:
+			offering_id = offering.offering_id
+			lab_duration = offering.subject.lab_duration or 3
+			allowed = self._allowed_slots(offering)
+			starts = {
+				slot: self.model.NewBoolVar(f"lab_start_{offering_id}_{labels[slot]}")
+				for slot in GRID.lab_start_slots(lab_duration)
+				if allowed[slot:slot + lab_duration].all()
+			}
+			covering: Dict[int, list] = defaultdict(list)
+			for slot, var in starts.items():
+				for i in range(lab_duration):
+					covering[slot + i].append(var)
+			self.lab_starts[offering_id] = starts
+			self.lab_covering[offering_id] = covering
+			self.variables[offering_id] = {slot: sum(covering[slot]) for slot in sorted(covering)}
+		
+		# Room choice: r[offering_id][room_id] = 1 if the offering is held in that room all
+		# week. Offerings with a single candidate room need no variable.
+		for offering_id, rooms in self.room_candidates.items():
+			if len(rooms) > 1:
+				self.room_vars[offering_id] = {
+					room_id: self.model.NewBoolVar(f"room_{offering_id}_{room_id}") for room_id in rooms
+				}
+		
+		self._build_layout()
+
+	def _build_layout(self):
+		"""Flatten the placement and room literals into index arrays, see slot_layout"""
+		position = {offering.offering_id: i for i, offering in enumerate(self.offerings)}
+		var_index: List[int] = []
+		# (offering position, slot, periods covered), converted to days and periods below
+		placed: List[Tuple[int, int, int]] = []
 		for offering in self.offerings:
 			offering_id = offering.offering_id
-			self.variables[offering_id] = {}
-			for day in DAYS:
-				self.variables[offering_id][day] = {}
-				for period in PERIODS:
-					var_name = f"x_{offering_id}_{day.value}_{period}"
-					self.variables[offering_id][day][period] = self.model.NewBoolVar(var_name)
+			pos = position[offering_id]
+			if offering_id in self.lab_starts:
+				duration = offering.subject.lab_duration or 3
+				for slot, var in self.lab_starts[offering_id].items():
+					var_index.append(var.Index())
+					placed.append((pos, slot, duration))
+			else:
+				for slot, var in self.variables[offering_id].items():
+					var_index.append(var.Index())
+					placed.append((pos, slot, 1))
+		placed_array = np.array(placed, dtype=np.int32).reshape(-1, 3)
+		slots = placed_array[:, 1]
+		self.slot_var_index = np.array(var_index, dtype=np.int64)
+		self.slot_layout = np.column_stack(
+			[placed_array[:, 0], GRID.slot_day[slots], GRID.slot_period[slots], placed_array[:, 2]]
+		).astype(np.int32)
+		
+		room_index: List[int] = []
+		room_layout: List[Tuple[int, int]] = []
+		for offering_id, choice in self.room_vars.items():
+			for room_id, var in choice.items():
+				room_index.append(var.Index())
+				room_layout.append((position[offering_id], room_id))
+		self.room_var_index = np.array(room_index, dtype=np.int64)
+		self.room_layout = np.array(room_layout, dtype=np.int32).reshape(-1, 2)
+
+	def _slot_vars(self, offering_ids: List[int], slot: int) -> list:
+		"""Literals occupying `slot` for the given offerings, skipping pruned slots.
+
+		Lab slots contribute their covering block starts, so the result is always
+		a flat list of literals whose sum is the slot occupancy.
+		"""
+		literals = []
+		for oid in offering_ids:
+			if oid in self.lab_covering:
+				literals.extend(self.lab_covering[oid].get(slot, ()))
+			else:
+				var = self.variables[oid].get(slot)
+				if var is not None:
+					literals.append(var)
+		return literals
+
+	def _session_vars(self, offering: SubjectOffering) -> Dict[int, Any]:
+		"""Vars counting an offering's sessions by slot; a lab session is one whole block"""
+		if offering.offering_id in self.lab_starts:
+			return self.lab_starts[offering.offering_id]
+		return self.variables[offering.offering_id]
+
+	def _daily_session_vars(self, offering: SubjectOffering, day_index: int) -> list:
+		"""Session vars of an offering on one day"""
+		session_vars = self._session_vars(offering)
+		return [session_vars[slot] for slot in GRID.day_slots(day_index) if slot in session_vars]
+
+	def _add_solution_hint(self):
+		"""Hint the previous timetable so CP-SAT starts from it instead of from scratch"""
+		if not self.previous_slots:
+			return
+		for offering_id, slot_vars in self.variables.items():
+			if offering_id in self.lab_starts:
+				continue  # lab occupancy is derived from the hinted block starts
+			for slot, var in slot_vars.items():
+				self.model.AddHint(var, 1 if (offering_id, slot) in self.previous_slots else 0)
+		for offering in self.index.lab_offerings:
+			lab_duration = offering.subject.lab_duration or 3
+			for slot, var in self.lab_starts[offering.offering_id].items():
+				block = all((offering.offering_id, slot + i) in self.previous_slots for i in range(lab_duration))
+				self.model.AddHint(var, 1 if block else 0)
+		print(f"   💡 Warm start from {len(self.previous_slots)} previous entries")
 
 	def _add_hard_constraints(self):
 		"""Add hard constraints that must be satisfied"""
 		print("🔧 Adding hard constraints...")
 		
 		# Constraint 1: Each offering must meet its sessions_per_week requirement
+		# (for labs, sessions_per_week counts lab blocks of lab_duration periods)
 		for offering in self.offerings:
-			offering_id = offering.offering_id
 			sessions_needed = offering.sessions_per_week
 			
-			# Sum of all time slots for this offering
-			session_vars = []
-			for day in DAYS:
-				for period in PERIODS:
-					session_vars.append(self.variables[offering_id][day][period])
-			
-			# Must have exactly sessions_needed sessions
-			self.model.Add(sum(session_vars) == sessions_needed)
+			# Sum of all sessions of this offering must be exactly sessions_needed
+			self.model.Add(sum(self._session_vars(offering).values()) == sessions_needed)
 			print(f"   ✅ {offering.subject.subject_name}: {sessions_needed} sessions per week")
 
 		# Constraint 2: No teacher can teach two classes at the same time
-		for day in DAYS:
-			for period in PERIODS:
-				# Group offerings by teacher for this time slot
-				teacher_offerings = defaultdict(list)
-				for offering in self.offerings:
-					teacher_offerings[offering.teacher_id].append(offering.offering_id)
-				
-				# Each teacher can teach at most one class per time slot
-				for teacher_id, offering_ids in teacher_offerings.items():
-					if len(offering_ids) > 1:
-						teacher_vars = [self.variables[oid][day][period] for oid in offering_ids]
-						self.model.Add(sum(teacher_vars) <= 1)
-
-		# Constraint 3: No room can be used by two classes at the same time
-		for day in DAYS:
-			for period in PERIODS:
-				# Group offerings by room for this time slot
-				room_offerings = defaultdict(list)
-				for offering in self.offerings:
-					room_id = self.subject_room_map.get(offering.subject.subject_id)
-					if room_id:
-						room_offerings[room_id].append(offering.offering_id)
-				
-				# Each room can host at most one class per time slot
-				for room_id, offering_ids in room_offerings.items():
-					if len(offering_ids) > 1:
-						room_vars = [self.variables[oid][day][period] for oid in offering_ids]
-						self.model.Add(sum(room_vars) <= 1)
+		for teacher_id, offering_ids in self.index.teacher_offering_ids.items():
+			if len(offering_ids) < 2:
+				continue
+			for slot in range(NUM_SLOTS):
+				teacher_vars = self._slot_vars(offering_ids, slot)
+				if len(teacher_vars) > 1:
+					self.model.AddAtMostOne(teacher_vars)
+
+		# Constraint 3: Each offering gets one room, and no room is used by two classes
+		# at the same time across the institution
+		for offering_id, choice in self.room_vars.items():
+			self.model.AddExactlyOne(list(choice.values()))
+		for room_id, offering_ids in self.index.room_offering_ids.items():
+			# Offerings of one batch never meet together (constraint 10), so only rooms
+			# shared by several batches need a clash constraint
+			offerings_by_batch: Dict[int, List[int]] = defaultdict(list)
+			for oid in offering_ids:
+				offerings_by_batch[self.index.offering_by_id[oid].batch_id].append(oid)
+			busy = self.room_occupancy.busy(room_id).ravel()
+			for slot in range(NUM_SLOTS):
+				if busy[slot]:
+					# Booked by another batch: meeting now rules this room out
+					for oid in offering_ids:
+						if oid in self.room_vars:
+							for literal in self._slot_vars([oid], slot):
+								self.model.AddImplication(literal, self.room_vars[oid][room_id].Not())
+					continue
+				if len(offerings_by_batch) < 2:
+					continue
+				room_vars = []
+				for batch_id, batch_offering_ids in offerings_by_batch.items():
+					fixed = [oid for oid in batch_offering_ids if oid not in self.room_vars]
+					room_vars.extend(self._slot_vars(fixed, slot))
+					chosen = [
+						(oid, literal)
+						for oid in batch_offering_ids if oid in self.room_vars
+						for literal in self._slot_vars([oid], slot)
+					]
+					if not chosen:
+						continue
+					# in_room = 1 whenever one of the batch's offerings meets now in this room
+					in_room = self.model.NewBoolVar(f"in_room_{batch_id}_{room_id}_{GRID.slot_label[slot]}")
+					for oid, literal in chosen:
+						self.model.AddBoolOr([literal.Not(), self.room_vars[oid][room_id].Not(), in_room])
+					room_vars.append(in_room)
+				if len(room_vars) > 1:
+					self.model.AddAtMostOne(room_vars)
 
 		# Constraint 4: Teacher daily session limits
 		for offering in self.offerings:
-			teacher = next((t for t in self.teachers if t.teacher_id == offering.teacher_id), None)
+			teacher = self.index.teacher_by_id.get(offering.teacher_id)
 			if teacher:
 				max_daily = teacher.max_sessions_per_day or 2
-				for day in DAYS:
-					daily_vars = [self.variables[offering.offering_id][day][period] for period in PERIODS]
-					self.model.Add(sum(daily_vars) <= max_daily)
+				for day_index in range(len(DAYS)):
+					daily_vars = self._daily_session_vars(offering, day_index)
+					if len(daily_vars) > max_daily:
+						self.model.Add(sum(daily_vars) <= max_daily)
 
 		# Constraint 5: Subject daily session limits
 		for offering in self.offerings:
 			max_daily = offering.max_sessions_per_day or 2
-			for day in DAYS:
-				daily_vars = [self.variables[offering.offering_id][day][period] for period in PERIODS]
-				self.model.Add(sum(daily_vars) <= max_daily)
-
-		# Constraint 6: First periods must be non-lab subjects
-		for day in DAYS:
-			for period in [MORNING_FIRST, AFTERNOON_FIRST]:
-				lab_vars = []
-				for offering in self.offerings:
-					if offering.subject.is_lab:
-						lab_vars.append(self.variables[offering.offering_id][day][period])
-				
-				# No lab subjects in first periods
-				if lab_vars:
-					self.model.Add(sum(lab_vars) == 0)
+			for day_index in range(len(DAYS)):
+				daily_vars = self._daily_session_vars(offering, day_index)
+				if len(daily_vars) > max_daily:
+					self.model.Add(sum(daily_vars) <= max_daily)
 
-		# Constraint 7: Lab subjects must be scheduled in continuous 3-period blocks
-		for offering in self.offerings:
-			if offering.subject.is_lab:
-				offering_id = offering.offering_id
-				lab_duration = offering.subject.lab_duration or 3
-				
-				# For each possible starting position, ensure continuity
-				for day in DAYS:
-					for start_period in PERIODS:
-						if start_period + lab_duration - 1 > max(PERIODS):
-							continue
-						
-						# If lab starts at start_period, it must occupy the next lab_duration periods
-						start_var = self.variables[offering_id][day][start_period]
-						
-						# Create implication: if start_var is true, then all subsequent periods must be true
-						for i in range(1, lab_duration):
-							next_period = start_period + i
-							if next_period <= max(PERIODS):
-								next_var = self.variables[offering_id][day][next_period]
-								# start_var implies next_var
-								self.model.Add(next_var >= start_var)
-
-		# Constraint 8: Respect existing teacher schedules (global conflicts)
-		for offering in self.offerings:
-			offering_id = offering.offering_id
-			teacher_id = offering.teacher_id
-			
-			for day in DAYS:
-				for period in PERIODS:
-					# If teacher is already scheduled elsewhere, this offering cannot be scheduled
-					if (teacher_id, day, period) in self.global_teacher_schedule:
-						self.model.Add(self.variables[offering_id][day][period] == 0)
+		# Constraints 6 & 7 (labs never in first periods, labs in contiguous blocks) and
+		# constraints 8 & 9 (teachers and rooms busy in other batches) hold by
+		# construction: _create_variables never creates the forbidden slots, and
+		# constraint 3 rules out booked rooms of offerings with a room choice.
 
-		# Constraint 9: Respect existing room schedules for labs
-		for offering in self.offerings:
-			if offering.subject.is_lab:
-				offering_id = offering.offering_id
-				room_id = self.subject_room_map.get(offering.subject.subject_id)
-				
-				if room_id:
-					for day in DAYS:
-						for period in PERIODS:
-							# If room is already scheduled elsewhere, this lab cannot be scheduled
-							if (room_id, day, period) in self.global_room_schedule:
-								self.model.Add(self.variables[offering_id][day][period] == 0)
+		# Constraint 10: A batch attends at most one class per time slot
+		for batch_id, offering_ids in self.index.batch_offering_ids.items():
+			if len(offering_ids) < 2:
+				continue
+			for slot in range(NUM_SLOTS):
+				batch_vars = self._slot_vars(offering_ids, slot)
+				if len(batch_vars) > 1:
+					self.model.AddAtMostOne(batch_vars)
 
 	def _add_soft_constraints(self):
 		"""Add soft constraints for optimization objectives"""
 		print("🎯 Adding soft constraints for optimization...")
 		
 		# Objective 1: Minimize teacher idle gaps
-		for teacher in self.teachers:
-			teacher_offerings = [o for o in self.offerings if o.teacher_id == teacher.teacher_id]
-			if not teacher_offerings:
-				continue
+		first_term = len(self.objective_terms)
+		for teacher_id, teacher_offering_ids in self.index.teacher_offering_ids.items():
+			# Count gaps between periods for this teacher
+			for slot in range(NUM_SLOTS):
+				if GRID.slot_period[slot] == NUM_PERIODS:
+					continue  # the day's last period has no next period
+				# Gap exists if teacher has class at this slot but not at the next one
+				has_class_now = self._slot_vars(teacher_offering_ids, slot)
+				has_class_next = self._slot_vars(teacher_offering_ids, slot + 1)
+				if not has_class_now:
+					continue  # no class possible now, so no gap either
+				
+				# Create gap variable
+				gap_var = self.model.NewBoolVar(f"gap_{teacher_id}_{GRID.slot_label[slot]}")
+				
+				# Gap exists if has class now but not next
+				now_sum = sum(has_class_now)
+				next_sum = sum(has_class_next)
 				
-			for day in DAYS:
-				# Count gaps between periods for this teacher
-				for period in range(1, max(PERIODS)):
-					# Gap exists if teacher has class at period but not at period+1
-					has_class_now = []
-					has_class_next = []
-					
-					for offering in teacher_offerings:
-						has_class_now.append(self.variables[offering.offering_id][day][period])
-						has_class_next.append(self.variables[offering.offering_id][day][period + 1])
-					
-					# Create gap variable
-					gap_var = self.model.NewBoolVar(f"gap_{teacher.teacher_id}_{day.value}_{period}")
-					
-					# Gap exists if has class now but not next
-					now_sum = sum(has_class_now)
-					next_sum = sum(has_class_next)
-					
-					# gap_var = 1 if now_sum >= 1 and next_sum == 0
-					self.model.Add(gap_var >= now_sum - next_sum)
-					self.model.Add(gap_var <= now_sum)
-					self.model.Add(gap_var <= 1 - next_sum)
-					
-					# Minimize gaps (add to objective)
-					self.objective_terms.append(gap_var)
-
-		# Objective 2: Balance teacher workload (minimize pairwise differences)
+				# gap_var = 1 if now_sum >= 1 and next_sum == 0
+				self.model.Add(gap_var >= now_sum - next_sum)
+				self.model.Add(gap_var <= now_sum)
+				self.model.Add(gap_var <= 1 - next_sum)
+				
+				# Minimize gaps (add to objective)
+				self.objective_terms.append(gap_var)
+		self.objective_groups["gaps"] = self.objective_terms[first_term:]
+
+		# Objective 2: Balance teacher workload (formulation chosen by balance_mode)
+		first_term = len(self.objective_terms)
 		teacher_to_workload: Dict[int, cp_model.IntVar] = {}
-		max_slots = len(DAYS) * len(PERIODS)
+		max_slots = NUM_SLOTS
 		
 		# Build an IntVar for each teacher's total assigned sessions and tie it to the sum of their x vars
-		for teacher in self.teachers:
-			teacher_offerings = [o for o in self.offerings if o.teacher_id == teacher.teacher_id]
-			if not teacher_offerings:
-				continue
+		for teacher_id, teacher_offering_ids in self.index.teacher_offering_ids.items():
 			workload_sum_terms = []
-			for offering in teacher_offerings:
-				for day in DAYS:
-					for period in PERIODS:
-						workload_sum_terms.append(self.variables[offering.offering_id][day][period])
-			workload_var = self.model.NewIntVar(0, max_slots, f"workload_{teacher.teacher_id}")
+			for offering_id in teacher_offering_ids:
+				workload_sum_terms.extend(self.variables[offering_id].values())
+			workload_var = self.model.NewIntVar(0, max_slots, f"workload_{teacher_id}")
 			self.model.Add(workload_var == sum(workload_sum_terms))
-			teacher_to_workload[teacher.teacher_id] = workload_var
+			teacher_to_workload[teacher_id] = workload_var
 		
-		# Add absolute difference vars for each pair of teachers and minimize their sum
-		teacher_ids = list(teacher_to_workload.keys())
-		for i in range(len(teacher_ids)):
-			for j in range(i + 1, len(teacher_ids)):
-				wi = teacher_to_workload[teacher_ids[i]]
-				wj = teacher_to_workload[teacher_ids[j]]
-				diff = self.model.NewIntVar(0, max_slots, f"workload_diff_{teacher_ids[i]}_{teacher_ids[j]}")
-				self.model.AddAbsEquality(diff, wi - wj)
-				self.objective_terms.append(diff)
+		if self.balance_mode == "pairwise":
+			self._add_pairwise_balance(teacher_to_workload, max_slots)
+		elif self.balance_mode == "mean":
+			self._add_mean_deviation_balance(teacher_to_workload, max_slots)
+		else:
+			self._add_spread_balance(teacher_to_workload, max_slots)
+		self.objective_groups["balance"] = self.objective_terms[first_term:]
 
 		# Objective 3: Maximize room utilization
-		for room in self.rooms:
+		first_term = len(self.objective_terms)
+		for room_id, offering_ids in self.index.room_offering_ids.items():
 			room_offerings = []
-			for offering in self.offerings:
-				room_id = self.subject_room_map.get(offering.subject.subject_id)
-				if room_id == room.room_id:
-					for day in DAYS:
-						for period in PERIODS:
-							room_offerings.append(self.variables[offering.offering_id][day][period])
+			for offering_id in offering_ids:
+				room_offerings.extend(self.variables[offering_id].values())
 			
 			if room_offerings:
 				# Maximize room usage (minimize negative usage)
 				usage_sum = sum(room_offerings)
-				neg_usage = self.model.NewIntVar(0, 40, f"neg_room_usage_{room.room_id}")
+				neg_usage = self.model.NewIntVar(0, NUM_SLOTS, f"neg_room_usage_{room_id}")
 				self.model.Add(neg_usage >= -usage_sum)
 				self.objective_terms.append(neg_usage)
+		self.objective_groups["rooms"] = self.objective_terms[first_term:]
+
+	def _add_pairwise_balance(self, teacher_to_workload: Dict[int, cp_model.IntVar], max_slots: int):
+		"""Add absolute difference vars for each pair of teachers and minimize their sum"""
+		teacher_ids = list(teacher_to_workload.keys())
+		for i in range(len(teacher_ids)):
+			for j in range(i + 1, len(teacher_ids)):
+				wi = teacher_to_workload[teacher_ids[i]]
+				wj = teacher_to_workload[teacher_ids[j]]
+				diff = self.model.NewIntVar(0, max_slots, f"workload_diff_{teacher_ids[i]}_{teacher_ids[j]}")
+				self.model.AddAbsEquality(diff, wi - wj)
+				self.objective_terms.append(diff)
+
+	def _add_mean_deviation_balance(self, teacher_to_workload: Dict[int, cp_model.IntVar], max_slots: int):
+		"""Minimize each teacher's deviation from the mean workload (scaled by T to stay integral)"""
+		count = len(teacher_to_workload)
+		if count < 2:
+			return
+		total = sum(teacher_to_workload.values())
+		for teacher_id, workload in teacher_to_workload.items():
+			deviation = self.model.NewIntVar(0, count * max_slots, f"workload_dev_{teacher_id}")
+			self.model.Add(deviation >= count * workload - total)
+			self.model.Add(deviation >= total - count * workload)
+			self.objective_terms.append(deviation)
+
+	def _add_spread_balance(self, teacher_to_workload: Dict[int, cp_model.IntVar], max_slots: int):
+		"""Minimize the gap between the busiest and the least busy teacher"""
+		if len(teacher_to_workload) < 2:
+			return
+		workloads = list(teacher_to_workload.values())
+		max_load = self.model.NewIntVar(0, max_slots, "workload_max")
+		min_load = self.model.NewIntVar(0, max_slots, "workload_min")
+		self.model.AddMaxEquality(max_load, workloads)
+		self.model.AddMinEquality(min_load, workloads)
+		spread = self.model.NewIntVar(0, max_slots, "workload_spread")
+		self.model.Add(spread == max_load - min_load)
+		self.objective_terms.append(spread)
+
+	def check_feasibility(self):
+		"""Reject inputs that cannot be scheduled before any model is built.
+
+		Raises InfeasibleInputError listing the offending offerings, so obviously
+		infeasible requests fail in milliseconds instead of at the time limit.
+		"""
+		with self._phase("precheck"):
+			issues = feasibility.check(self)
+		if issues:
+			print(f"❌ Feasibility pre-check failed with {len(issues)} issue(s):")
+			for issue in issues:
+				print(f"   ⚠️ {issue['message']}")
+			raise InfeasibleInputError(issues)
+
+	def stop(self):
+		"""Ask a running solve to stop; it returns the best solution found so far"""
+		self._stopped = True
+		self.solver.StopSearch()
 
 	def _solve(self) -> bool:
 		"""Solve the CP-SAT model"""
 		print("🚀 Solving with OR-Tools CP-SAT...")
 		
-		# Set objective to minimize the sum of all objective terms
-		if self.objective_terms:
-			self.model.Minimize(sum(self.objective_terms))
-		
-		# Solve
-		status = self.solver.Solve(self.model)
+		if self.objective_mode == "staged" and self.objective_terms:
+			status = self._solve_staged()
+		else:
+			# Set objective to minimize the sum of all objective terms
+			if self.objective_terms:
+				self.model.Minimize(sum(self.objective_terms))
+			status = self._run_solver()
+			if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+				self._response = self.solver.ResponseProto()
+			self.solver_stats = {
+				"solver_status": self.solver.StatusName(),
+				"solver_wall_time": round(self.solver.WallTime(), 4),
+				"num_conflicts": self.solver.NumConflicts(),
+				"num_branches": self.solver.NumBranches(),
+				"objective_value": self.solver.ObjectiveValue() if self.objective_terms and self._response else None,
+				"best_bound": self.solver.BestObjectiveBound() if self.objective_terms and self._response else None,
+				"objectives": self._objective_values() if self._response else None,
+			}
 		
 		if status == cp_model.OPTIMAL:
 			print("✅ Found optimal solution!")
@@ -356,164 +753,492 @@ class TimetableScheduler:
 			print("❌ No solution found")
 			return False
 
-	def _extract_solution(self) -> Dict[Tuple[DayOfWeek, int], Dict]:
-		"""Extract the solution from the solver"""
-		solution = {}
+	def _run_solver(self) -> int:
+		if self.progress_callback:
+			callback = SolutionProgressCallback(self, self.progress_callback, self.stream_assignment, self.stream_solutions)
+			return self.solver.Solve(self.model, callback)
+		return self.solver.Solve(self.model)
+
+	def _solve_staged(self) -> int:
+		"""Lexicographic solve: feasibility, then each objective group in priority order.
+
+		Each stage gets its share of what is left of the time budget, so time a
+		stage does not use rolls over. A stage's result is fixed as an upper
+		bound and its solution hinted to the next stage. Returns OPTIMAL only if
+		every objective stage was solved to optimality.
+		"""
+		budget = self.solver.parameters.max_time_in_seconds
+		deadline = time.perf_counter() + budget
+		groups = [(name, self.objective_groups.get(name)) for name in OBJECTIVE_STAGES]
+		groups = [(name, terms) for name, terms in groups if terms]
+		secondary_share = (1 - STAGE_FEASIBILITY_SHARE - STAGE_PRIMARY_SHARE) / max(1, len(groups) - 1)
+		stages = [("feasibility", None, STAGE_FEASIBILITY_SHARE)] + [
+			(name, terms, STAGE_PRIMARY_SHARE if i == 0 else secondary_share)
+			for i, (name, terms) in enumerate(groups)
+		]
 		
-		for offering in self.offerings:
-			offering_id = offering.offering_id
-			for day in DAYS:
-				for period in PERIODS:
-					if self.solver.Value(self.variables[offering_id][day][period]) == 1:
-						# This offering is scheduled at (day, period)
-						room_id = self.subject_room_map.get(offering.subject.subject_id)
-						
-						entry_data = {
-							"subject_id": offering.subject.subject_id,
-							"teacher_id": offering.teacher_id,
-							"room_id": room_id,
-							"is_lab_session": offering.subject.is_lab,
-							"lab_session_part": None  # Will be determined later for labs
-						}
-						
-						solution[(day, period)] = entry_data
-		
-		return solution
+		stage_stats: List[Dict[str, Any]] = []
+		all_optimal = True
+		status = cp_model.UNKNOWN
+		for i, (name, terms, share) in enumerate(stages):
+			remaining = deadline - time.perf_counter()
+			if self._stopped or remaining <= 0:
+				all_optimal = False
+				break
+			pending_share = sum(stage[2] for stage in stages[i:])
+			self.solver.parameters.max_time_in_seconds = remaining * share / pending_share
+			self.solver.parameters.stop_after_first_solution = terms is None
+			self.model.ClearObjective()
+			if terms:
+				self.model.Minimize(sum(terms))
+			self.stage = name
+			status = self._run_solver()
+			found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+			stage_stats.append({
+				"stage": name,
+				"status": self.solver.StatusName(),
+				"wall_time": round(self.solver.WallTime(), 4),
+				"objective": self.solver.ObjectiveValue() if terms and found else None,
+				"num_conflicts": self.solver.NumConflicts(),
+				"num_branches": self.solver.NumBranches(),
+			})
+			print(f"   🪜 Stage {name}: {self.solver.StatusName()} in {self.solver.WallTime():.2f}s" + (f", objective {self.solver.ObjectiveValue():.0f}" if terms and found else ""))
+			if not found:
+				if self._response is None:
+					break  # not even a feasible schedule
+				all_optimal = False
+				continue
+			if terms:
+				all_optimal = all_optimal and status == cp_model.OPTIMAL
+				self.model.Add(sum(terms) <= round(self.solver.ObjectiveValue()))
+			self._response = self.solver.ResponseProto()
+			self.model.ClearHints()
+			hint = self.model.Proto().solution_hint
+			hint.vars.extend(range(len(self._response.solution)))
+			hint.values.extend(self._response.solution)
+		
+		self.solver.parameters.max_time_in_seconds = budget
+		self.solver.parameters.stop_after_first_solution = False
+		if self._response is None:
+			final = status
+		else:
+			final = cp_model.OPTIMAL if all_optimal else cp_model.FEASIBLE
+		objectives = self._objective_values() if self._response is not None else None
+		self.solver_stats = {
+			"solver_status": self.solver.StatusName(final),
+			"solver_wall_time": round(sum(stage["wall_time"] for stage in stage_stats), 4),
+			"num_conflicts": sum(stage["num_conflicts"] for stage in stage_stats),
+			"num_branches": sum(stage["num_branches"] for stage in stage_stats),
+			# Same scale as weighted mode: the plain sum of every objective term
+			"objective_value": float(sum(objectives.values())) if objectives is not None else None,
+			"best_bound": None,
+			"objectives": objectives,
+			"stages": stage_stats,
+		}
+		return final
+
+	def _objective_values(self, values: Optional[np.ndarray] = None) -> Dict[str, int]:
+		"""Value of each objective group in the final solution (or in `values`)"""
+		values = self._solution_values() if values is None else values
+		return {
+			name: int(values[[term.Index() for term in terms]].sum()) if terms else 0
+			for name, terms in self.objective_groups.items()
+		}
+
+	def _solution_values(self, response=None) -> np.ndarray:
+		"""Every variable value of the solver response (or a solution callback's) in one bulk copy"""
+		if response is None:
+			response = self._response if self._response is not None else self.solver.ResponseProto()
+		return np.fromiter(response.solution, dtype=np.int64, count=len(response.solution))
+
+	def _solved_slots(self, values: np.ndarray) -> np.ndarray:
+		"""Occupied slots of a solution as (offering position, day index, period, lab part) rows.
+
+		Lab block starts are expanded into their periods; lab part is the period's
+		1-based offset in its block, 0 for other classes.
+		"""
+		chosen = self.slot_layout[values[self.slot_var_index] == 1]
+		lengths = chosen[:, 3]
+		rows = np.repeat(chosen, lengths, axis=0)
+		offsets = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+		parts = np.where(rows[:, 3] > 1, offsets + 1, 0)
+		return np.column_stack([rows[:, 0], rows[:, 1], rows[:, 2] + offsets, parts])
+
+	def _extract_solution(self, response=None) -> Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]:
+		"""Extract the solution from the solver (or a solution callback's response), grouped by batch"""
+		values = self._solution_values(response)
+		solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]] = {batch_id: {} for batch_id in self.batch_ids}
+		
+		# Rooms picked by the solver
+		if len(self.room_var_index):
+			for pos, room_id in self.room_layout[values[self.room_var_index] == 1].tolist():
+				self.offering_room_map[self.offerings[pos].offering_id] = room_id
+		
+		# Per offering position: (batch_id, offering_id, subject_id, teacher_id, is_lab)
+		static = [
+			(o.batch_id, o.offering_id, o.subject.subject_id, o.teacher_id, o.subject.is_lab)
+			for o in self.offerings
+		]
+		for pos, day_index, period, part in self._solved_slots(values).tolist():
+			batch_id, offering_id, subject_id, teacher_id, is_lab = static[pos]
+			solutions[batch_id][(DAYS[day_index], period)] = {
+				"subject_id": subject_id,
+				"teacher_id": teacher_id,
+				"room_id": self.offering_room_map.get(offering_id),
+				"is_lab_session": is_lab,
+				"lab_session_part": part or None,
+			}
+		
+		return solutions
 
 
 	def generate(self) -> Timetable:
-		"""Generate the complete timetable using OR-Tools CP-SAT"""
-		# Create timetable record
-		tt = Timetable(batch_id=self.batch_id, generation_date=datetime.utcnow(), status="generated")
-		self.db.add(tt)
-		self.db.commit()
-		self.db.refresh(tt)
+		"""Generate the complete timetable using OR-Tools CP-SAT; raises NoSolutionError on failure"""
+		return self._run()[self.batch_id]
+
+	def generate_all(self) -> List[Timetable]:
+		"""Generate timetables for every batch of this scheduler in one joint solve"""
+		timetables = self._run()
+		return [timetables[batch_id] for batch_id in self.batch_ids]
+
+	def _run(self) -> Dict[int, Timetable]:
+		"""Build, solve and persist the model; returns the Timetable of each batch.
+
+		Nothing is written to the timetables tables unless the solve succeeds;
+		every attempt, failed or not, is recorded in the run log.
+		"""
+		try:
+			self.check_feasibility()
+		except InfeasibleInputError:
+			self.record_run("infeasible")
+			raise
 		
 		if not self.offerings or not self.teachers or not self.rooms:
 			print("⚠️ No offerings, teachers, or rooms available")
-			return tt
+			with self._phase("persist"):
+				timetables = persist_timetables(self.db, {batch_id: {} for batch_id in self.batch_ids})
+			self.record_run("generated", timetables)
+			return timetables
+		
+		# Identical inputs were solved before: materialize the cached entries
+		cache_key = solution_cache.fingerprint(self) if self.use_cache else None
+		solutions = solution_cache.lookup(self.db, cache_key) if cache_key else None
+		if solutions is not None:
+			self.cache_hit = True
+		else:
+			solutions = self.solve()
+			if solutions is None:
+				print("❌ Failed to find a solution. Consider relaxing constraints or adding more resources.")
+				raise NoSolutionError(self.batch_ids, self.record_run("failed"))
+			# A stopped or time-starved partial answer must not be served as the result of a full solve
+			if cache_key and self._complete():
+				solution_cache.store(self.db, cache_key, solutions)
+				self.stored_cache_key = cache_key
+		
+		# Step 7: Persist the timetables and their entries in one transaction
+		with self._phase("persist"):
+			if self.persist_lock is not None:
+				with self.persist_lock:
+					self._check_clashes(solutions)
+					timetables = persist_timetables(self.db, solutions)
+			else:
+				timetables = persist_timetables(self.db, solutions)
+		self.record_run("generated", timetables)
+		
+		# Report solution quality
+		for batch_id in self.batch_ids:
+			self._report_solution_quality(solutions[batch_id], batch_id)
 		
-		print(f"\n🎯 Generating timetable for batch {self.batch_id} using OR-Tools CP-SAT")
+		return timetables
+
+	def _check_clashes(self, solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]):
+		"""Raise OccupancyClashError if other batches booked the solution's slots since loading"""
+		self.db.commit()  # end the read transaction so bookings committed meanwhile are seen
+		clashes = occupancy.solution_clashes(self.db, solutions)
+		if clashes:
+			raise occupancy.OccupancyClashError(self.batch_ids, clashes, self.record_run("failed"))
+
+	def _complete(self) -> bool:
+		"""True when the solve was not stopped and proved optimality or used its whole time budget"""
+		if self._stopped:
+			return False
+		status = self.solver_stats.get("solver_status")
+		if status == "OPTIMAL":
+			return True
+		wall_time = self.solver_stats.get("solver_wall_time") or 0.0
+		return status == "FEASIBLE" and wall_time >= 0.99 * self.solver_params["max_time_in_seconds"]
+
+	def record_run(self, status: str, timetables: Optional[Dict[int, Timetable]] = None):
+		"""Store this run's metrics in the run log; kept on self.run"""
+		timetable_ids = [timetables[batch_id].timetable_id for batch_id in self.batch_ids] if timetables else None
+		self.run = run_log.record(self.db, self.metrics(), self.batch_ids, status, timetable_ids)
+		return self.run
+
+	def solve(self) -> Optional[Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]]:
+		"""Build and solve the model without writing to the database.
+
+		Returns the entries of each batch keyed by (day, period), or None when
+		no solution was found.
+		"""
+		print(f"\n🎯 Generating timetable for batch(es) {self.batch_ids} using OR-Tools CP-SAT")
 		print(f"   📊 {len(self.offerings)} offerings, {len(self.teachers)} teachers, {len(self.rooms)} rooms")
 		
 		# Step 1: Create CP-SAT variables
-		self._create_variables()
-		print(f"   ✅ Created {sum(len(day_vars) for offering_vars in self.variables.values() for day_vars in offering_vars.values())} variables")
+		with self._phase("variables"):
+			self._create_variables()
+		print(f"   ✅ Created {len(self.model.Proto().variables)} variables")
 		
 		# Step 2: Add hard constraints
-		self._add_hard_constraints()
+		with self._phase("hard_constraints"):
+			self._add_hard_constraints()
+			# A warm-start hint is one specific member of its symmetric family and
+			# would likely violate the ordering, so hinted runs keep the symmetry
+			if self.symmetry_breaking and not self.previous_slots:
+				self.symmetry_stats = symmetry.add_symmetry_breaking(self)
+				print(f"   🪞 Symmetry breaking: {self.symmetry_stats['symmetric_rooms']} rooms in {self.symmetry_stats['room_classes']} class(es), {self.symmetry_stats['symmetric_offerings']} offerings in {self.symmetry_stats['offering_classes']} class(es)")
+			self._add_solution_hint()
 		
 		# Step 3: Add soft constraints for optimization
-		self._add_soft_constraints()
+		with self._phase("soft_constraints"):
+			self._add_soft_constraints()
 		
 		# Step 4: Solve the model
-		if not self._solve():
-			print("❌ Failed to find a solution. Consider relaxing constraints or adding more resources.")
-			tt.status = "failed"
-			self.db.commit()
-			return tt
-		
-		# Step 5: Extract solution
-		solution = self._extract_solution()
-		print(f"   ✅ Extracted solution with {len(solution)} scheduled entries")
-		
-		# Step 6: Process lab sessions to add lab_session_part
-		solution = self._process_lab_sessions(solution)
-		
-		# Step 7: Persist entries to database
-		entries_created = 0
-		for (day, period), entry_data in solution.items():
-			entry = TimetableEntry(
-				timetable_id=tt.timetable_id,
-				subject_id=entry_data.get("subject_id"),
-				teacher_id=entry_data.get("teacher_id"),
-				room_id=entry_data.get("room_id"),
-				day_of_week=day,
-				period_number=period,
-				is_lab_session=entry_data.get("is_lab_session", False),
-				lab_session_part=entry_data.get("lab_session_part")
-			)
-			self.db.add(entry)
-			entries_created += 1
-		
-		self.db.commit()
-		print(f"   ✅ Created {entries_created} timetable entries in database")
+		with self._phase("solve"):
+			solved = self._solve()
+		if not solved:
+			return None
 		
-		# Report solution quality
-		self._report_solution_quality(solution)
+		# Step 5: Extract solution, with lab_session_part numbered within each block
+		with self._phase("extract"):
+			solutions = self._extract_solution()
+		print(f"   ✅ Extracted solution with {sum(len(solution) for solution in solutions.values())} scheduled entries")
 		
-		return tt
+		return solutions
 
-	def _process_lab_sessions(self, solution: Dict[Tuple[DayOfWeek, int], Dict]) -> Dict[Tuple[DayOfWeek, int], Dict]:
-		"""Process lab sessions to add lab_session_part numbers"""
-		# Group lab sessions by subject and day
-		lab_sessions = defaultdict(list)
-		
-		for (day, period), entry_data in solution.items():
-			if entry_data.get("is_lab_session"):
-				subject_id = entry_data.get("subject_id")
-				lab_sessions[(subject_id, day)].append((period, entry_data))
-		
-		# Assign lab_session_part numbers
-		for (subject_id, day), sessions in lab_sessions.items():
-			# Sort by period number
-			sessions.sort(key=lambda x: x[0])
-			
-			# Assign part numbers
-			for part_num, (period, entry_data) in enumerate(sessions, 1):
-				entry_data["lab_session_part"] = part_num
+	def solve_pool(self, k: int, min_distance: int = POOL_MIN_DISTANCE) -> Optional[List[Dict[str, Any]]]:
+		"""Build the model once and return up to `k` distinct solutions, best first.
+
+		After the first solve, each further candidate is the best solution that
+		moves at least `min_distance` sessions of every earlier candidate (a
+		Hamming-distance cut over the placement literals), searched from the
+		previous candidate as a hint. Room choices do not count as a difference.
+		Fewer than `k` candidates come back when the budget runs out or no more
+		distinct solutions exist. Each candidate carries its entries by batch,
+		its objective, the value of each objective group and its distance to the
+		best candidate. Returns None when not even one solution was found.
+		"""
+		budget = self.solver.parameters.max_time_in_seconds
+		deadline = time.perf_counter() + budget
+		if k > 1:
+			self.solver.parameters.max_time_in_seconds = budget * POOL_FIRST_SHARE
+		solutions = self.solve()
+		if solutions is None:
+			self.solver.parameters.max_time_in_seconds = budget
+			return None
 		
-		return solution
+		placements = [self._solution_values()[self.slot_var_index]]
+		candidates = [self._candidate(solutions, self._solution_values(), placements)]
+		with self._phase("pool"):
+			# Further candidates minimize the plain sum of the objectives; in staged
+			# mode the bounds fixed by each stage still hold
+			self.model.ClearObjective()
+			if self.objective_terms:
+				self.model.Minimize(sum(self.objective_terms))
+			self.solver.parameters.stop_after_first_solution = False
+			while len(candidates) < k and not self._stopped:
+				remaining = deadline - time.perf_counter()
+				if remaining <= 0:
+					break
+				previous = placements[-1]
+				chosen = self.slot_var_index[previous == 1]
+				self.model.Add(
+					sum(self.model.GetBoolVarFromProtoIndex(int(index)) for index in chosen) <= len(chosen) - min_distance
+				)
+				self.model.ClearHints()
+				hint = self.model.Proto().solution_hint
+				hint.vars.extend(range(len(self._response.solution)))
+				hint.values.extend(self._response.solution)
+				self.solver.parameters.max_time_in_seconds = remaining / (k - len(candidates))
+				status = self._run_solver()
+				if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+					print(f"   🛑 No further candidate at distance {min_distance}: {self.solver.StatusName()}")
+					break
+				self._response = self.solver.ResponseProto()
+				values = self._solution_values()
+				placements.append(values[self.slot_var_index])
+				candidates.append(self._candidate(self._extract_solution(), values, placements))
+				print(f"   🔀 Candidate {len(candidates)}: objective {candidates[-1]['objective']}, {candidates[-1]['distance']} sessions moved")
+		self.solver.parameters.max_time_in_seconds = budget
+		self.pool_stats = [{key: value for key, value in candidate.items() if key != "solutions"} for candidate in candidates]
+		return candidates
+
+	def _candidate(self, solutions: Dict[int, Dict], values: np.ndarray, placements: List[np.ndarray]) -> Dict[str, Any]:
+		"""A pool entry: entries by batch plus its scores"""
+		objectives = self._objective_values(values)
+		best, current = placements[0], placements[-1]
+		return {
+			"rank": len(placements),
+			"solutions": solutions,
+			"objective": sum(objectives.values()),
+			"objectives": objectives,
+			# Sessions placed differently from the best candidate
+			"distance": int(((best == 1) & (current == 0)).sum()),
+		}
 
-	def _report_solution_quality(self, solution: Dict[Tuple[DayOfWeek, int], Dict]):
-		"""Report the quality of the generated solution"""
-		print("\n📊 Solution Quality Report:")
+	def _report_solution_quality(self, solution: Dict[Tuple[DayOfWeek, int], Dict], batch_id: int):
+		"""Report the quality of the generated solution for one batch"""
+		print(f"\n📊 Solution Quality Report (batch {batch_id}):")
 		
-		# Count sessions per subject
+		# Count sessions per subject; teacher and room usage come from occupancy grids
 		subject_sessions = defaultdict(int)
-		teacher_sessions = defaultdict(int)
-		room_usage = defaultdict(int)
-		
-		for (day, period), entry_data in solution.items():
-			subject_id = entry_data.get("subject_id")
-			teacher_id = entry_data.get("teacher_id")
-			room_id = entry_data.get("room_id")
-			
-			if subject_id:
-				subject_sessions[subject_id] += 1
-			if teacher_id:
-				teacher_sessions[teacher_id] += 1
-			if room_id:
-				room_usage[room_id] += 1
+		for entry_data in solution.values():
+			if entry_data.get("subject_id"):
+				subject_sessions[entry_data["subject_id"]] += 1
+		teacher_grid = OccupancyGrid.from_entries(
+			(entry_data["teacher_id"], day, period) for (day, period), entry_data in solution.items() if entry_data.get("teacher_id")
+		)
+		room_grid = OccupancyGrid.from_entries(
+			(entry_data["room_id"], day, period) for (day, period), entry_data in solution.items() if entry_data.get("room_id")
+		)
+		teacher_sessions = teacher_grid.load()
+		room_usage = room_grid.load()
+		room_utilization = room_grid.utilization()
 		
 		# Report subject sessions
 		print("   📚 Subject Sessions:")
 		for offering in self.offerings:
+			if offering.batch_id != batch_id:
+				continue
 			subject_id = offering.subject.subject_id
 			scheduled = subject_sessions.get(subject_id, 0)
 			required = offering.sessions_per_week
+			if offering.subject.is_lab:
+				# Entries are periods; a lab session is a block of lab_duration periods
+				required *= offering.subject.lab_duration or 3
 			status = "✅" if scheduled == required else "⚠️"
 			print(f"      {status} {offering.subject.subject_name}: {scheduled}/{required} sessions")
 		
 		# Report teacher workload
 		print("   👨‍🏫 Teacher Workload:")
 		for teacher in self.teachers:
-			sessions = teacher_sessions.get(teacher.teacher_id, 0)
-			max_daily = teacher.max_sessions_per_day or 2
+			sessions = int(teacher_sessions[teacher.teacher_id]) if teacher.teacher_id < len(teacher_sessions) else 0
 			max_weekly = teacher.max_sessions_per_week or 10
 			status = "✅" if sessions <= max_weekly else "⚠️"
 			print(f"      {status} {teacher.teacher_name}: {sessions} sessions/week (max: {max_weekly})")
 		
 		# Report room utilization
 		print("   🏫 Room Utilization:")
+		max_possible = NUM_SLOTS
 		for room in self.rooms:
-			usage = room_usage.get(room.room_id, 0)
-			max_possible = len(DAYS) * len(PERIODS)
-			utilization = (usage / max_possible) * 100 if max_possible > 0 else 0
+			in_grid = room.room_id < len(room_usage)
+			usage = int(room_usage[room.room_id]) if in_grid else 0
+			utilization = room_utilization[room.room_id] * 100 if in_grid else 0.0
 			print(f"      📍 {room.room_name}: {usage}/{max_possible} slots ({utilization:.1f}%)")
 
 
-def generate_timetable(db: Session, batch_id: int) -> Timetable:
-	"""Generate timetable for a specific batch"""
-	scheduler = TimetableScheduler(db, batch_id)
+class NoSolutionError(RuntimeError):
+	"""The solver found no timetable; nothing was written except the run log row `run`"""
+
+	def __init__(self, batch_ids: List[int], run=None):
+		self.batch_ids = batch_ids
+		self.run = run
+		super().__init__(f"No solution found for batch(es) {batch_ids}")
+
+	def __reduce__(self):
+		return (NoSolutionError, (self.batch_ids, self.run))
+
+
+def persist_timetables(
+	db: Session,
+	solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]],
+	status: str = "generated",
+) -> Dict[int, Timetable]:
+	"""Write one Timetable per batch and all of its entries in a single transaction.
+
+	Called only after a successful solve, so no partial or failed timetable is
+	ever visible. Entries go in as one bulk INSERT. Timetables written with
+	status "candidate" (solution pool alternatives) occupy no teachers or rooms
+	until they are adopted.
+	"""
+	generated_at = datetime.utcnow()
+	timetables = {
+		batch_id: Timetable(batch_id=batch_id, generation_date=generated_at, status=status, version=1)
+		for batch_id in solutions
+	}
+	db.add_all(timetables.values())
+	db.flush()  # assigns timetable ids
+	entries_created = _write_entries(db, timetables, solutions, occupies=status == "generated")
+	print(f"   ✅ Created {entries_created} timetable entries in database")
+	return timetables
+
+
+def publish_version(db: Session, timetable: Timetable, solution: Dict[Tuple[DayOfWeek, int], Dict]) -> int:
+	"""Replace the entries of `timetable` with a better solution as its next version.
+
+	Readers see either the old or the new version: the swap is one transaction.
+	Returns the new version number.
+	"""
+	db.query(TimetableEntry).filter(TimetableEntry.timetable_id == timetable.timetable_id).delete(synchronize_session=False)
+	timetable.version = (timetable.version or 1) + 1
+	timetable.generation_date = datetime.utcnow()
+	_write_entries(db, {timetable.batch_id: timetable}, {timetable.batch_id: solution})
+	return timetable.version
+
+
+def _write_entries(
+	db: Session,
+	timetables: Dict[int, Timetable],
+	solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]],
+	occupies: bool = True,
+) -> int:
+	"""Bulk insert the entries of each batch's timetable, bump occupancy and commit"""
+	rows: List[Dict[str, Any]] = []
+	teacher_slots: Dict[int, List[Tuple[int, DayOfWeek, int]]] = defaultdict(list)
+	room_slots: Dict[int, List[Tuple[int, DayOfWeek, int]]] = defaultdict(list)
+	lab_slots: Dict[int, List[Tuple[int, DayOfWeek, int]]] = defaultdict(list)
+	for batch_id, solution in solutions.items():
+		for (day, period), entry_data in solution.items():
+			if entry_data.get("teacher_id"):
+				teacher_slots[batch_id].append((entry_data["teacher_id"], day, period))
+				if entry_data.get("is_lab_session"):
+					lab_slots[batch_id].append((entry_data["teacher_id"], day, period))
+			if entry_data.get("room_id"):
+				room_slots[batch_id].append((entry_data["room_id"], day, period))
+			rows.append({
+				"timetable_id": timetables[batch_id].timetable_id,
+				"subject_id": entry_data.get("subject_id"),
+				"teacher_id": entry_data.get("teacher_id"),
+				"room_id": entry_data.get("room_id"),
+				"day_of_week": day,
+				"period_number": period,
+				"is_lab_session": entry_data.get("is_lab_session", False),
+				"lab_session_part": entry_data.get("lab_session_part"),
+			})
+	if rows:
+		db.execute(insert(TimetableEntry), rows)
+	if not occupies:
+		db.commit()
+		return len(rows)
+
+	versions = occupancy.touch(db, solutions.keys())
+	db.commit()
+	# The written timetables are now their batches' latest: cache them as written
+	for batch_id, tt in timetables.items():
+		occupancy.remember(batch_id, tt.timetable_id, versions[batch_id], teacher_slots[batch_id], room_slots[batch_id], lab_slots[batch_id])
+	return len(rows)
+
+
+def generate_timetable(db: Session, batch_id: int, warm_start: bool = False, repair_hint: bool = False) -> Timetable:
+	"""Generate timetable for a specific batch, optionally warm-started from its latest timetable"""
+	scheduler = TimetableScheduler(db, batch_id, warm_start=warm_start, repair_hint=repair_hint)
 	return scheduler.generate()
+
+
+def generate_all(db: Session, batch_ids: List[int]) -> List[Timetable]:
+	"""Generate timetables for several batches in one joint CP-SAT solve.
+
+	Teachers and rooms are shared capacity across all requested batches, so the
+	result no longer depends on the order batches are regenerated in.
+	"""
+	scheduler = TimetableScheduler(db, batch_ids=batch_ids)
+	return scheduler.generate_all()
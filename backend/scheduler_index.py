@@ -0,0 +1,45 @@
+"""
+Grouping indexes used while building a TimetableScheduler model.
+
+Built once per scheduler so the constraint and objective builders look up
+offerings by teacher, room or batch instead of rescanning every offering
+inside their (day, period) loops.
+"""
+
+from collections import defaultdict
+from typing import Dict, List
+
+from backend.models.models import Teacher, Room, SubjectOffering
+
+
+class SchedulerIndex:
+	def __init__(
+		self,
+		offerings: List[SubjectOffering],
+		teachers: List[Teacher],
+		rooms: List[Room],
+		room_candidates: Dict[int, List[int]],
+	):
+		self.teacher_by_id: Dict[int, Teacher] = {t.teacher_id: t for t in teachers}
+		self.room_by_id: Dict[int, Room] = {r.room_id: r for r in rooms}
+		self.offering_by_id: Dict[int, SubjectOffering] = {o.offering_id: o for o in offerings}
+
+		# Offering ids grouped by the resource they compete for
+		self.teacher_offering_ids: Dict[int, List[int]] = defaultdict(list)
+		self.room_offering_ids: Dict[int, List[int]] = defaultdict(list)
+		self.batch_offering_ids: Dict[int, List[int]] = defaultdict(list)
+
+		self.lab_offerings: List[SubjectOffering] = []
+		self.non_lab_offerings: List[SubjectOffering] = []
+
+		for offering in offerings:
+			self.teacher_offering_ids[offering.teacher_id].append(offering.offering_id)
+			self.batch_offering_ids[offering.batch_id].append(offering.offering_id)
+			# An offering competes for every room it may be placed in
+			for room_id in room_candidates.get(offering.offering_id, []):
+				self.room_offering_ids[room_id].append(offering.offering_id)
+			if offering.subject.is_lab:
+				self.lab_offerings.append(offering)
+			else:
+				self.non_lab_offerings.append(offering)
+
@@ -0,0 +1,130 @@
+"""
+The weekly slot grid shared by the scheduler, occupancy and move validation.
+
+A week is `days` x `periods_per_day` slots, split into sessions (morning,
+afternoon, ...) at `session_starts`. Every slot is a small int,
+
+	slot = day_index * periods_per_day + (period - 1)
+
+and the day index, period and session of each slot are precomputed arrays, so
+hot loops index arrays instead of hashing (DayOfWeek, period) pairs. The
+database keeps its day_of_week / period_number columns; convert at the edges
+with slot(), day_of() and period_of().
+
+The grid is configured by SCHEDULER_DAYS (a comma separated subset of
+DayOfWeek, in order), SCHEDULER_PERIODS (periods per day) and
+SCHEDULER_SESSION_STARTS (first period of each session). The default is the
+5 x 8 week with a morning of periods 1-4 and an afternoon of periods 5-8.
+"""
+
+import os
+from typing import List, Sequence
+
+import numpy as np
+
+from backend.models.models import DayOfWeek
+
+
+class SlotGrid:
+	def __init__(self, days: Sequence[DayOfWeek], periods_per_day: int, session_starts: Sequence[int] = (1,)):
+		starts = sorted(set(session_starts) | {1})
+		if periods_per_day < 1 or starts[-1] > periods_per_day:
+			raise ValueError(f"Session starts {list(session_starts)} do not fit {periods_per_day} periods per day")
+		self.days: List[DayOfWeek] = list(days)
+		self.periods: List[int] = list(range(1, periods_per_day + 1))
+		self.num_days = len(self.days)
+		self.num_periods = periods_per_day
+		self.num_slots = self.num_days * self.num_periods
+		self.day_index = {day: i for i, day in enumerate(self.days)}
+
+		# Periods of each session, e.g. [[1, 2, 3, 4], [5, 6, 7, 8]]
+		ends = starts[1:] + [periods_per_day + 1]
+		self.sessions: List[List[int]] = [list(range(start, end)) for start, end in zip(starts, ends)]
+		# Session of each period, indexed by period - 1
+		self.period_session = np.repeat(np.arange(len(self.sessions)), [len(s) for s in self.sessions])
+		self.session_names = ["AM", "PM"] if len(self.sessions) == 2 else [f"S{i + 1}" for i in range(len(self.sessions))]
+
+		# Day index, period and session of each slot
+		self.slot_day = np.repeat(np.arange(self.num_days), self.num_periods)
+		self.slot_period = np.tile(np.arange(1, self.num_periods + 1), self.num_days)
+		self.slot_session = np.tile(self.period_session, self.num_days)
+		# "Mon_3" style label of each slot, for model variable names
+		self.slot_label = [f"{day.value}_{period}" for day in self.days for period in self.periods]
+
+	def slot(self, day: DayOfWeek, period: int) -> int:
+		return self.day_index[day] * self.num_periods + period - 1
+
+	def contains(self, day: DayOfWeek, period: int) -> bool:
+		return day in self.day_index and 1 <= period <= self.num_periods
+
+	def day_of(self, slot: int) -> DayOfWeek:
+		return self.days[self.slot_day[slot]]
+
+	def period_of(self, slot: int) -> int:
+		return int(self.slot_period[slot])
+
+	def day_slots(self, day_index: int) -> range:
+		start = day_index * self.num_periods
+		return range(start, start + self.num_periods)
+
+	def session_of(self, period: int) -> int:
+		return int(self.period_session[period - 1])
+
+	def session_columns(self, period: int) -> slice:
+		"""Period columns (0-based) of the session containing `period`"""
+		session = self.sessions[self.session_of(period)]
+		return slice(session[0] - 1, session[-1])
+
+	def half_of(self, period: int) -> str:
+		return self.session_names[self.session_of(period)]
+
+	def lab_block_starts(self, lab_duration: int) -> List[int]:
+		"""Periods a lab block may start at.
+
+		A block stays inside one session and never occupies the session's first
+		period, which is reserved for non-lab subjects.
+		"""
+		return [
+			start
+			for session in self.sessions
+			for start in session[1:]
+			if start + lab_duration - 1 <= session[-1]
+		]
+
+	def lab_start_slots(self, lab_duration: int) -> List[int]:
+		"""Slots a lab block may start at, day by day; see lab_block_starts"""
+		starts = self.lab_block_starts(lab_duration)
+		return [day_index * self.num_periods + start - 1 for day_index in range(self.num_days) for start in starts]
+
+
+def _from_env() -> SlotGrid:
+	days = [DayOfWeek(name.strip()) for name in os.getenv("SCHEDULER_DAYS", "Mon,Tue,Wed,Thu,Fri").split(",") if name.strip()]
+	periods = int(os.getenv("SCHEDULER_PERIODS", "8"))
+	starts = [int(start) for start in os.getenv("SCHEDULER_SESSION_STARTS", "1,5").split(",") if start.strip()]
+	return SlotGrid(days, periods, starts)
+
+
+GRID = _from_env()
+
+# Shorthands for the configured grid
+DAYS = GRID.days
+PERIODS = GRID.periods
+DAY_INDEX = GRID.day_index
+NUM_PERIODS = GRID.num_periods
+NUM_SLOTS = GRID.num_slots
+
+
+def half_of(period: int) -> str:
+	return GRID.half_of(period)
+
+
+def is_morning(period: int) -> bool:
+	return GRID.session_of(period) == 0
+
+
+def is_afternoon(period: int) -> bool:
+	return GRID.session_of(period) > 0
+
+
+def lab_block_starts(lab_duration: int) -> List[int]:
+	return GRID.lab_block_starts(lab_duration)
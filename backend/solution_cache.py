@@ -0,0 +1,138 @@
+"""
+Content-addressed cache of solved timetables.
+
+The key is a SHA-256 fingerprint of the normalized solver inputs (offerings,
+teacher limits, rooms, lab durations and the frozen entries of other batches),
+so an identical generate request is answered from the cache without a solve.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func  # type: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # type: ignore[reportMissingImports]
+
+from backend.models.models import SolutionCacheEntry, DayOfWeek
+
+# Bump when the model changes in a way that makes old cached solutions invalid
+CACHE_VERSION = 3
+
+# Size-based eviction: least recently used entries go first
+MAX_CACHE_BYTES = int(os.getenv("SOLUTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+CACHE_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def fingerprint(scheduler) -> str:
+	"""Hash everything the CP-SAT model of `scheduler` is built from"""
+	inputs = {
+		"version": CACHE_VERSION,
+		"batches": sorted(scheduler.batch_ids),
+		"balance_mode": scheduler.balance_mode,
+		"objective_mode": scheduler.objective_mode,
+		"symmetry_breaking": scheduler.symmetry_breaking,
+		# Worker count only changes speed; the other parameters change the result
+		"solver": {name: value for name, value in scheduler.solver_params.items() if name != "num_workers"},
+		"room_candidates": sorted((oid, rooms) for oid, rooms in scheduler.room_candidates.items()),
+		"offerings": sorted(
+			(
+				o.offering_id,
+				o.batch_id,
+				o.subject_id,
+				o.teacher_id,
+				o.sessions_per_week,
+				o.max_sessions_per_day,
+				bool(o.subject.is_lab),
+				o.subject.lab_duration,
+			)
+			for o in scheduler.offerings
+		),
+		"teachers": sorted((t.teacher_id, t.max_sessions_per_day) for t in scheduler.teachers),
+		"rooms": sorted((r.room_id, r.room_type or "", r.assigned_batch_id or 0) for r in scheduler.rooms),
+		"busy_teachers": [(tid, day.value, period) for (tid, day, period) in scheduler.teacher_occupancy.slots()],
+		"busy_rooms": [(rid, day.value, period) for (rid, day, period) in scheduler.room_occupancy.slots()],
+	}
+	raw = json.dumps(inputs, separators=(",", ":"), sort_keys=True)
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lookup(db: Session, key: str) -> Optional[Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]]:
+	"""Return the cached solutions for `key`, or None on a miss"""
+	row = db.get(SolutionCacheEntry, key)
+	if row is None:
+		CACHE_STATS["misses"] += 1
+		return None
+	CACHE_STATS["hits"] += 1
+	row.hit_count += 1
+	row.last_used_at = datetime.utcnow()
+	db.commit()
+
+	solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]] = {}
+	for batch_id, entries in json.loads(row.payload).items():
+		solutions[int(batch_id)] = {(DayOfWeek(day), period): entry_data for day, period, entry_data in entries}
+	return solutions
+
+
+def store(db: Session, key: str, solutions: Dict[int, Dict[Tuple[DayOfWeek, int], Dict]]):
+	"""Cache solved entries under `key` and evict old entries beyond the size budget"""
+	payload = json.dumps(
+		{
+			str(batch_id): [[day.value, period, entry_data] for (day, period), entry_data in sorted(solution.items(), key=lambda item: (item[0][0].value, item[0][1]))]
+			for batch_id, solution in solutions.items()
+		},
+		separators=(",", ":"),
+	)
+	row = db.get(SolutionCacheEntry, key)
+	if row is None:
+		row = SolutionCacheEntry(fingerprint=key, batch_ids=",".join(str(b) for b in sorted(solutions)), hit_count=0)
+		db.add(row)
+	row.payload = payload
+	row.size_bytes = len(payload)
+	row.last_used_at = datetime.utcnow()
+	db.commit()
+	CACHE_STATS["stores"] += 1
+	evict(db)
+
+
+def discard(db: Session, key: str) -> bool:
+	"""Remove one cached solution, e.g. one stored by a run that was then cancelled"""
+	removed = db.query(SolutionCacheEntry).filter(SolutionCacheEntry.fingerprint == key).delete(synchronize_session=False)
+	db.commit()
+	return bool(removed)
+
+
+def evict(db: Session, max_bytes: int = MAX_CACHE_BYTES) -> int:
+	"""Drop least recently used entries until the cache fits in `max_bytes`"""
+	total = db.query(func.coalesce(func.sum(SolutionCacheEntry.size_bytes), 0)).scalar() or 0
+	if total <= max_bytes:
+		return 0
+	evicted = 0
+	rows = db.query(SolutionCacheEntry.fingerprint, SolutionCacheEntry.size_bytes).order_by(SolutionCacheEntry.last_used_at.asc()).all()
+	stale: List[str] = []
+	for key, size in rows:
+		if total <= max_bytes:
+			break
+		stale.append(key)
+		total -= size
+		evicted += 1
+	if stale:
+		db.query(SolutionCacheEntry).filter(SolutionCacheEntry.fingerprint.in_(stale)).delete(synchronize_session=False)
+		db.commit()
+	CACHE_STATS["evictions"] += evicted
+	return evicted
+
+
+def stats(db: Session) -> Dict[str, int]:
+	"""Process-level hit/miss counters plus the persistent cache size"""
+	entries, total_bytes = db.query(func.count(SolutionCacheEntry.fingerprint), func.coalesce(func.sum(SolutionCacheEntry.size_bytes), 0)).one()
+	return {**CACHE_STATS, "entries": entries, "size_bytes": int(total_bytes), "max_bytes": MAX_CACHE_BYTES}
+
+
+def clear(db: Session) -> int:
+	"""Remove every cached solution"""
+	removed = db.query(SolutionCacheEntry).delete(synchronize_session=False)
+	db.commit()
+	return removed
@@ -0,0 +1,104 @@
+"""
+Symmetry breaking for a TimetableScheduler model.
+
+Two kinds of interchangeable objects make CP-SAT explore (and, when proving
+optimality, refute) the same timetable many times over:
+
+- rooms of the same type and capacity that are candidates of exactly the same
+  offerings and are booked by other batches in exactly the same slots: any
+  solution stays a solution when two of them swap their offerings;
+- offerings of one batch with the same teacher, session counts, daily limit,
+  lab block length, candidate rooms and placement variables: swapping their
+  whole weekly schedules gives another solution.
+
+Both are detected from the model inputs only, and broken with ordering
+constraints that keep at least one solution of every symmetric family, so
+neither feasibility nor the optimum changes.
+"""
+
+from collections import defaultdict
+from typing import Dict, List
+
+
+def room_classes(scheduler) -> List[List[int]]:
+	"""Groups of two or more interchangeable rooms, each sorted by id"""
+	groups: Dict[tuple, List[int]] = defaultdict(list)
+	for room_id, offering_ids in scheduler.index.room_offering_ids.items():
+		# Only rooms chosen by a variable can be swapped
+		if not offering_ids or any(oid not in scheduler.room_vars for oid in offering_ids):
+			continue
+		room = scheduler.index.room_by_id[room_id]
+		key = (
+			room.room_type,
+			room.capacity,
+			tuple(sorted(offering_ids)),
+			scheduler.room_occupancy.busy(room_id).tobytes(),
+		)
+		groups[key].append(room_id)
+	return [sorted(rooms) for rooms in groups.values() if len(rooms) > 1]
+
+
+def _placement_key(scheduler, offering_id: int) -> tuple:
+	"""The offering's placement variables as slots, block starts for labs"""
+	return tuple(sorted(scheduler.lab_starts.get(offering_id) or scheduler.variables[offering_id]))
+
+
+def offering_classes(scheduler) -> List[List[int]]:
+	"""Groups of two or more interchangeable offerings, each sorted by id"""
+	groups: Dict[tuple, List[int]] = defaultdict(list)
+	for offering in scheduler.offerings:
+		offering_id = offering.offering_id
+		key = (
+			offering.batch_id,
+			offering.teacher_id,
+			offering.sessions_per_week,
+			offering.max_sessions_per_day or 2,
+			bool(offering.subject.is_lab),
+			(offering.subject.lab_duration or 3) if offering.subject.is_lab else None,
+			tuple(scheduler.room_candidates.get(offering_id, [])),
+			_placement_key(scheduler, offering_id),
+		)
+		groups[key].append(offering_id)
+	return [sorted(offering_ids) for offering_ids in groups.values() if len(offering_ids) > 1]
+
+
+def _break_rooms(scheduler, rooms: List[int]) -> int:
+	"""Value precedence: room b may only be chosen after the room before it was"""
+	model = scheduler.model
+	offering_ids = sorted(scheduler.index.room_offering_ids[rooms[0]])
+	added = 0
+	for a, b in zip(rooms, rooms[1:]):
+		earlier = []
+		for offering_id in offering_ids:
+			model.AddBoolOr([scheduler.room_vars[offering_id][b].Not()] + earlier)
+			earlier.append(scheduler.room_vars[offering_id][a])
+			added += 1
+	return added
+
+
+def _break_offerings(scheduler, offering_ids: List[int]) -> int:
+	"""Order the offerings by a weighted sum of their occupied slots"""
+	model = scheduler.model
+
+	def position(offering_id: int):
+		slots = scheduler.lab_starts.get(offering_id) or scheduler.variables[offering_id]
+		return sum((slot + 1) * var for slot, var in slots.items())
+
+	for first, second in zip(offering_ids, offering_ids[1:]):
+		model.Add(position(first) <= position(second))
+	return len(offering_ids) - 1
+
+
+def add_symmetry_breaking(scheduler) -> Dict[str, int]:
+	"""Add ordering constraints for every symmetric room and offering class; returns counts"""
+	rooms = room_classes(scheduler)
+	offerings = offering_classes(scheduler)
+	constraints = sum(_break_rooms(scheduler, group) for group in rooms)
+	constraints += sum(_break_offerings(scheduler, group) for group in offerings)
+	return {
+		"room_classes": len(rooms),
+		"symmetric_rooms": sum(len(group) for group in rooms),
+		"offering_classes": len(offerings),
+		"symmetric_offerings": sum(len(group) for group in offerings),
+		"constraints": constraints,
+	}
@@ -146,7 +146,8 @@ export default function TimetableBuilder() {
 			setToast("Updated");
 			setTimeout(() => setToast(""), 1500);
 		} catch (e) {
-			const msg = e?.response?.data?.detail || "Invalid move";
+			const detail = e?.response?.data?.detail;
+			const msg = detail?.message || detail || "Invalid move";
 			setError(msg);
 			setTimeout(() => setError(""), 2500);
 		} finally {
@@ -463,7 +463,8 @@ class TimetableOptimizer:
 
         # Set solver parameters
         self.solver.parameters.max_time_in_seconds = time_limit
-        self.solver.parameters.num_search_workers = 8
+        # 0 lets CP-SAT use every core; SCHEDULER_MAX_WORKERS caps it like the main backend
+        self.solver.parameters.num_workers = int(os.getenv("SCHEDULER_MAX_WORKERS", "0"))
 
         # Solve
         status = self.solver.Solve(self.model)